@@ -1,58 +1,167 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-import joblib
-import pandas as pd
-from features import extract_features
+from features import LEXICAL_FEATURES, extract_features_detailed, extract_lexical_features, warm_browser_pool, _normalize_url
+from features import FEATURE_DEADLINE
+from features import browser_pool, dns_guard, host_guard, resolver, tls_probe, whois_guard, _whois_cache
+from concurrent.futures import ThreadPoolExecutor
 from pymongo import MongoClient
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import time
+import atexit
+import hashlib
+import math
+import logging
 from dotenv import load_dotenv
+from cache import SingleFlight, TTLCache
+from logging_config import configure_logging, dropped_records
+from metrics import CONTENT_TYPE, REGISTRY, STAGE_SECONDS, cache_samples
+from write_behind import WriteBehindQueue
+from rollups import GRANULARITIES, RollupStore
+from scoring import DISCRIMINATIVE_FEATURES, LookupTableScorer, Scorer, load_lexical_model, load_model, summarize
 import warnings
 
 warnings.filterwarnings("ignore")
 load_dotenv()
+configure_logging()
+
+logger = logging.getLogger(__name__)
+# One INFO record per answered check (url, verdict, source, duration)
+check_log = logging.getLogger("checks")
 
 MODEL_PATH = os.getenv("MODEL_PATH", "models/phishing_model_optimized.pkl")
 
-DISCRIMINATIVE_FEATURES = [
-    "having_IP_Address",
-    "having_Sub_Domain",
-    "SSLfinal_State",
-    "Domain_registeration_length",
-    "Request_URL",
-    "URL_of_Anchor",
-    "Links_in_tags",
-    "SFH",
-    "age_of_domain",
-    "DNSRecord",
-]
+# url_checks inserts are queued and written in batches by a background thread
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000"))
+WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "100"))
+WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", "1.0"))
+WRITE_BEHIND_POLICY = os.getenv("WRITE_BEHIND_POLICY", "drop")
+
+# /stats results are reused for this many seconds between dashboard polls
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "10"))
+
+# SCORER=lut answers predictions from a precomputed table of the model's
+# output for every possible feature vector. With LUT_PATH set the table is
+# saved there and, on later starts with the same model, loaded without
+# unpickling the model at all.
+SCORER_MODE = os.getenv("SCORER", "model")
+LUT_PATH = os.getenv("LUT_PATH")
+
+# /predict/batch limits: URLs per request and URLs analyzed at once
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "100"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+
+# Time budget per /predict or /predict/batch request: "timeout_ms" in the
+# body, else REQUEST_TIMEOUT_MS, and never more than FEATURE_DEADLINE.
+# Probes still running when it is spent are given their fallback value;
+# the result lists them under "imputed" and is marked "degraded".
+REQUEST_TIMEOUT_MS = float(os.getenv("REQUEST_TIMEOUT_MS", str(FEATURE_DEADLINE * 1000)))
+# Kept back from extraction for scoring and writing the response
+REQUEST_TIMEOUT_RESERVE_MS = float(os.getenv("REQUEST_TIMEOUT_RESERVE_MS", "50"))
+
+# Finished results per normalized URL, reused until they expire
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "900"))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "10000"))
 
 model = None
+scorer = None
 FEATURE_NAMES = DISCRIMINATIVE_FEATURES
 MODEL_TYPE = "Unknown"
 MODEL_ACCURACY = None
+MODEL_VERSION = None
 
-def load_model(path):
-    artifact = joblib.load(path)
-    
-    if isinstance(artifact, dict):
-        m = artifact.get("model")
-        features = artifact.get("features", DISCRIMINATIVE_FEATURES)
-        model_type = artifact.get("model_type", "Unknown")
-        accuracy = artifact.get("accuracy", None)
-        return m, features, model_type, accuracy
-    else:
-        return artifact, DISCRIMINATIVE_FEATURES, "Unknown", None
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+def _load_lookup_table(version):
+    """Saved table for this model version, or None"""
+    if not (LUT_PATH and os.path.exists(LUT_PATH)):
+        return None
+    try:
+        table, meta = LookupTableScorer.load(LUT_PATH)
+    except Exception as e:
+        print(f"⚠️ Could not read lookup table {LUT_PATH}: {e}")
+        return None
+    if meta.get("model_version") != version:
+        print(f"⚠️ Lookup table {LUT_PATH} is for another model - rebuilding")
+        return None
+    return table, meta
 
 try:
-    model, FEATURE_NAMES, MODEL_TYPE, MODEL_ACCURACY = load_model(MODEL_PATH)
-    print(f"✓ Loaded {MODEL_TYPE} model with {len(FEATURE_NAMES)} features")
+    MODEL_VERSION = os.getenv("MODEL_VERSION") or _file_digest(MODEL_PATH)
+    saved = _load_lookup_table(MODEL_VERSION) if SCORER_MODE == "lut" else None
+    if saved:
+        scorer, meta = saved
+        FEATURE_NAMES = scorer.feature_names
+        MODEL_TYPE = meta.get("model_type") or "Unknown"
+        MODEL_ACCURACY = meta.get("accuracy") or None
+        print(f"✓ Loaded lookup table for {MODEL_TYPE} model with {len(FEATURE_NAMES)} features")
+    else:
+        model, FEATURE_NAMES, MODEL_TYPE, MODEL_ACCURACY = load_model(MODEL_PATH)
+        print(f"✓ Loaded {MODEL_TYPE} model with {len(FEATURE_NAMES)} features")
+        scorer = Scorer(model, FEATURE_NAMES)
+        if SCORER_MODE == "lut":
+            scorer, live = LookupTableScorer.from_scorer(scorer), scorer
+            checked = scorer.verify(live)
+            print(f"✓ Built lookup table ({len(scorer.probas)} entries, verified on {checked} rows)")
+            if LUT_PATH:
+                scorer.save(LUT_PATH, model_version=MODEL_VERSION,
+                            model_type=MODEL_TYPE, accuracy=MODEL_ACCURACY)
     if MODEL_ACCURACY:
         print(f"  Accuracy: {MODEL_ACCURACY:.4f}")
 except Exception as e:
     raise RuntimeError(f"Could not load model: {e}")
 
+# TIERED=1 scores each URL with the artifact's lexical-only model first and
+# gathers the network features only when its phishing probability falls
+# strictly inside the uncertainty band. TIER_LOW/TIER_HIGH override the band
+# chosen at training time.
+TIERED = os.getenv("TIERED", "0") == "1"
+lexical_scorer = None
+TIER_BAND = None
+TIER_INFO = {}
+
+if TIERED:
+    try:
+        loaded = load_lexical_model(MODEL_PATH)
+        if loaded is None:
+            print("⚠️ Model artifact has no lexical model - tiered mode disabled")
+        elif list(loaded[1]) != [name for name, _ in LEXICAL_FEATURES]:
+            print("⚠️ Lexical model features don't match features.py - tiered mode disabled")
+        else:
+            lexical_model, lexical_features, TIER_INFO = loaded
+            low, high = TIER_INFO.get("band") or (0.2, 0.8)
+            low, high = float(os.getenv("TIER_LOW", low)), float(os.getenv("TIER_HIGH", high))
+            # Outside the band the lexical verdict is final, so the band must
+            # hold every probability the lexical model is unsure about
+            if not 0 <= low < 0.5 < high <= 1:
+                raise ValueError(f"TIER_LOW/TIER_HIGH must satisfy 0 <= low < 0.5 < high <= 1, got {low}, {high}")
+            live = Scorer(lexical_model, lexical_features)
+            lexical_scorer = LookupTableScorer.from_scorer(live)
+            lexical_scorer.verify(live)
+            TIER_BAND = (low, high)
+            print(f"✓ Tiered mode: lexical band {TIER_BAND}")
+            if TIER_INFO.get("accuracy") is not None:
+                print(f"  Tiered accuracy at training band: {TIER_INFO['accuracy']:.4f} "
+                      f"({TIER_INFO['escalation_rate']:.1%} of URLs escalated)")
+    except Exception as e:
+        print(f"⚠️ Could not load lexical model - tiered mode disabled: {e}")
+
 app = Flask(__name__)
+_batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch")
+result_cache = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+# Concurrent requests for the same normalized URL share one extraction
+_extractions = SingleFlight()
+stats_cache = TTLCache(maxsize=1, ttl=STATS_CACHE_TTL)
+# Dashboards polling when the cached stats expire share one recomputation
+_stats_flight = SingleFlight()
+
+# Each /stats count is answered from one of these indexes alone
+STATS_INDEXES = ([("prediction", 1)], [("checkedAt", 1)])
 
 # CORS Configuration - Allow your Node.js service
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*").split(",")
@@ -61,19 +170,133 @@ CORS(app, origins=ALLOWED_ORIGINS, supports_credentials=True)
 # MongoDB Connection with better error handling
 MONGODB_URI = os.getenv("MONGODB_URI")
 mongodb_connected = False
+url_checks = None
+check_writer = None
+rollups = None
 
-if MONGODB_URI:
+def connect_mongodb():
+    """Connect to MongoDB and start the write-behind queue for url_checks"""
+    global mongodb_connected, url_checks, check_writer, rollups
+    if not MONGODB_URI:
+        print("⚠️ MONGODB_URI not set - database features disabled")
+        return
     try:
         client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
         client.server_info()
         db = client["mydb"]
         url_checks = db["urlchecks"]
+        for keys in STATS_INDEXES:
+            try:
+                url_checks.create_index(keys)
+            except Exception as e:
+                print(f"⚠️ Could not create urlchecks index {keys}: {e} - /stats will scan the collection")
+        rollups = RollupStore(db)
+        check_writer = WriteBehindQueue(
+            url_checks,
+            max_size=WRITE_BEHIND_MAX_QUEUE,
+            batch_size=WRITE_BEHIND_BATCH,
+            flush_interval=WRITE_BEHIND_INTERVAL,
+            policy=WRITE_BEHIND_POLICY,
+            on_flush=rollups.record,
+            on_flush_time=STAGE_SECONDS.labels("db_flush").observe,
+        )
+        atexit.register(check_writer.close)
         mongodb_connected = True
         print("✓ MongoDB connected")
     except Exception as e:
         print(f"⚠️ MongoDB not available: {e}")
-else:
-    print("⚠️ MONGODB_URI not set - database features disabled")
+
+def init_worker():
+    """Per-process startup: database connection and browser warm-up.
+
+    Neither a MongoClient nor running threads survive fork(), so under
+    gunicorn with preload_app this runs in each worker after it is forked
+    (see gunicorn.conf.py) while the model is loaded once in the master.
+    """
+    connect_mongodb()
+    # Start the Selenium fallback browsers now rather than on the first blocked page
+    if os.getenv("BROWSER_POOL_WARM", "1") == "1":
+        warm_browser_pool()
+
+def shutdown_worker():
+    """Write out queued url_checks before the process exits"""
+    if check_writer is not None:
+        check_writer.close()
+
+# INIT_ON_IMPORT=0 leaves init_worker() to the server (gunicorn.conf.py sets it)
+if os.getenv("INIT_ON_IMPORT", "1") == "1":
+    init_worker()
+
+REQUESTS_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "Requests being handled", ("endpoint",))
+REQUEST_SECONDS = REGISTRY.histogram("http_request_seconds", "Request latency", ("endpoint", "status"))
+CHECKS = REGISTRY.counter("checks_total", "URL checks answered, by where the result came from", ("source",))
+COALESCED = REGISTRY.counter("coalesced_extractions_total",
+                             "Extractions skipped by waiting on one already running for the same URL")
+
+def _collect():
+    yield from cache_samples({
+        "result": result_cache, "whois": _whois_cache, "dns": resolver, "tls": tls_probe,
+    })
+    if check_writer is not None:
+        w = check_writer.stats()
+        yield ("write_behind_queue_depth", "gauge", "url_checks documents waiting to be written",
+               [({}, w["queue_depth"])])
+        yield ("write_behind_documents_total", "counter", "url_checks documents by outcome",
+               [({"outcome": k}, w[k]) for k in ("enqueued", "dropped", "written", "failed")])
+    b = browser_pool.stats()
+    yield ("browser_pool_sessions", "gauge", "Selenium browser sessions by state",
+           [({"state": "idle"}, b["idle"]), ({"state": "busy"}, b["busy"])])
+    yield ("browser_pool_waiting", "gauge", "Threads waiting for a browser", [({}, b["waiting"])])
+    guards = {"host": host_guard.stats(), "dns": dns_guard.stats(), "whois": whois_guard.stats()}
+    yield ("probe_rejected_total", "counter", "Probes skipped: circuit open or over the rate limit",
+           [({"guard": n, "reason": r}, v) for n, s in guards.items() for r, v in s["rejected"].items()])
+    yield ("circuit_open_targets", "gauge", "Targets whose circuit is open",
+           [({"guard": n}, s["open"]) for n, s in guards.items()])
+    yield ("circuit_opened_total", "counter", "Times a target's circuit opened",
+           [({"guard": n}, s["opened"]) for n, s in guards.items()])
+    yield ("log_records_dropped_total", "counter", "Log records dropped because the log queue was full",
+           [({}, dropped_records())])
+
+REGISTRY.register_collector(_collect)
+
+def _finish_check(response, started):
+    """Count an answered check and log it as one record"""
+    source = "cache" if response.get("cached") else response.get("tier", "full")
+    CHECKS.labels(source).inc()
+    if check_log.isEnabledFor(logging.INFO):
+        check_log.info("check", extra={"fields": {
+            "url": response["url"],
+            "prediction": response["prediction"],
+            "confidence": response["confidence"],
+            "phishingProbability": response["phishingProbability"],
+            "signals": response["signals"],
+            "source": source,
+            "degraded": response.get("degraded", False),
+            "user": response["user"],
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }})
+
+@app.before_request
+def _start_request_timer():
+    g.metrics_endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    g.metrics_start = time.perf_counter()
+    REQUESTS_IN_FLIGHT.labels(g.metrics_endpoint).inc()
+
+@app.after_request
+def _observe_request(response):
+    if "metrics_start" in g:
+        REQUEST_SECONDS.labels(g.metrics_endpoint, str(response.status_code)).observe(
+            time.perf_counter() - g.metrics_start)
+    return response
+
+@app.teardown_request
+def _end_request(exc):
+    if g.pop("metrics_start", None) is not None:
+        REQUESTS_IN_FLIGHT.labels(g.metrics_endpoint).dec()
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
 
 @app.route("/", methods=["GET"])
 def home():
@@ -88,32 +311,259 @@ def home():
         "database": "connected" if mongodb_connected else "disconnected",
     })
 
+def _compute_stats():
+    """All /stats numbers, counted on url_checks itself.
+
+    The collection is shared with the Node service, which inserts and
+    deletes checks this process never sees, so nothing is kept as a running
+    counter. The total comes from the collection metadata and the other
+    counts are index-only scans of STATS_INDEXES.
+    """
+    total = url_checks.estimated_document_count()
+    phishing = url_checks.count_documents({"prediction": "phishing"})
+    result = {
+        "total_checks": total,
+        "phishing_detected": phishing,
+        "legitimate": url_checks.count_documents({"prediction": "legitimate"}),
+        "recent_24h": url_checks.count_documents({"checkedAt": {"$gte": datetime.now() - timedelta(days=1)}}),
+        "phishing_rate": round(phishing / total * 100, 2) if total > 0 else 0
+    }
+    stats_cache.set("stats", result)
+    return result
+
 @app.route("/stats", methods=["GET"])
 def stats():
     if not mongodb_connected:
         return jsonify({"error": "Database not connected"}), 503
     
     try:
-        total = url_checks.count_documents({})
-        phishing = url_checks.count_documents({"prediction": "phishing"})
-        legitimate = url_checks.count_documents({"prediction": "legitimate"})
-        
-        from datetime import timedelta
-        yesterday = datetime.now() - timedelta(days=1)
-        recent = url_checks.count_documents({"checkedAt": {"$gte": yesterday}})
-        
-        return jsonify({
-            "total_checks": total,
-            "phishing_detected": phishing,
-            "legitimate": legitimate,
-            "recent_24h": recent,
-            "phishing_rate": round(phishing / total * 100, 2) if total > 0 else 0
-        })
+        result = stats_cache.get("stats")
+        if result is None:
+            result = _stats_flight.do("stats", _compute_stats)
+        return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/stats/timeseries", methods=["GET"])
+def stats_timeseries():
+    if not mongodb_connected:
+        return jsonify({"error": "Database not connected"}), 503
+
+    granularity = request.args.get("granularity", "hour")
+    if granularity not in GRANULARITIES:
+        return jsonify({"error": f"granularity must be one of {sorted(GRANULARITIES)}"}), 400
+    try:
+        periods = int(request.args.get("periods", 24 if granularity == "hour" else 30))
+        top = int(request.args.get("top", 10))
+    except ValueError:
+        return jsonify({"error": "periods and top must be integers"}), 400
+    if not 1 <= periods <= 24 * 90:
+        return jsonify({"error": "periods must be between 1 and 2160"}), 400
+
+    try:
+        return jsonify(rollups.timeseries(granularity, periods, datetime.now(), top=top))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _feature_table(url, features_list, overrides):
+    lines = [f"Features for {url}:"]
+    for fname, fval in zip(FEATURE_NAMES, features_list):
+        indicator = "🚨 SUSPICIOUS" if fval == 1 else "✓ OK" if fval == -1 else "⚠️ NEUTRAL"
+        lines.append(f"  {fname:30s} = {fval:2d}  {indicator}")
+    lines += [f"  OVERRIDE: {reason}" for reason in overrides]
+    return "\n".join(lines)
+
+def _build_result(url, user_id, features_list, prediction, proba, imputed=()):
+    verdict = summarize(scorer.classes, FEATURE_NAMES, features_list, prediction, proba)
+    overrides = verdict.pop("overrides")
+    # The table is only worth formatting when someone will read it
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(_feature_table(url, features_list, overrides))
+
+    return {
+        "url": url,
+        **verdict,
+        "imputed": list(imputed),
+        "degraded": bool(imputed),
+        "checkedAt": datetime.now().isoformat(),
+        "user": str(user_id)
+    }
+
+def _remember(url, response):
+    # A degraded result would be served to callers with time to spare
+    if not response.get("degraded"):
+        result_cache.set(_cache_key(url), response)
+
+def _lexical_result(url, user_id):
+    """Result from the lexical tier when it is confident about url, else None"""
+    if lexical_scorer is None:
+        return None
+    with STAGE_SECONDS.labels("lexical").time():
+        row = extract_lexical_features(url)
+        prediction, proba = lexical_scorer.score_one(row)
+    phishing = float(proba[lexical_scorer.classes.index(1)])
+    low, high = TIER_BAND
+    if low < phishing < high:
+        return None
+    verdict = summarize(lexical_scorer.classes, lexical_scorer.feature_names, row, prediction, proba)
+    verdict.pop("overrides")
+    return {
+        "url": url,
+        **verdict,
+        "tier": "lexical",
+        # Same keys as a full result; the lexical tier imputes nothing
+        "imputed": [],
+        "degraded": False,
+        "checkedAt": datetime.now().isoformat(),
+        "user": str(user_id)
+    }
+
+def _cache_key(url):
+    return (_normalize_url(url), MODEL_VERSION)
+
+def _cached_result(url, user_id):
+    """Cached result for url re-addressed to this request, or None"""
+    cached = result_cache.get(_cache_key(url))
+    if cached is None:
+        return None
+    return dict(cached, url=url, user=str(user_id), cached=True)
+
+def _db_entry(response):
+    entry = dict(response)
+    entry.pop("cached", None)
+    entry["checkedAt"] = datetime.now()
+    return entry
+
+def _check_features(features_list):
+    """Error body if the extractor output can't be scored, else None"""
+    if not isinstance(features_list, (list, tuple)):
+        return {"error": "Feature extraction failed"}
+    if len(features_list) != len(FEATURE_NAMES):
+        return {
+            "error": "Feature length mismatch",
+            "expected": len(FEATURE_NAMES),
+            "got": len(features_list)
+        }
+    return None
+
+def _request_budget(data):
+    """Seconds the request may take, from timeout_ms or the server default"""
+    value = data.get("timeout_ms", REQUEST_TIMEOUT_MS)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) \
+            or not math.isfinite(value) or value <= 0:
+        raise ValueError("timeout_ms must be a positive number")
+    return min(value / 1000, FEATURE_DEADLINE)
+
+def _extraction_timeout(budget, started):
+    return max(0.0, budget - (time.perf_counter() - started) - REQUEST_TIMEOUT_RESERVE_MS / 1000)
+
+def _extract(url, budget, started):
+    """(features, imputed) for url within the request's budget, joining an
+    extraction of the same URL with the same budget already in progress"""
+    leader = False
+
+    def run():
+        nonlocal leader
+        leader = True
+        with STAGE_SECONDS.labels("extract").time():
+            return extract_features_detailed(url, _extraction_timeout(budget, started))
+
+    features_list, imputed = _extractions.do((_normalize_url(url), budget), run)
+    if not leader:
+        COALESCED.inc()
+        # Every waiter gets the same objects; don't let one caller's changes leak
+        features_list = list(features_list) if isinstance(features_list, (list, tuple)) else features_list
+        imputed = list(imputed)
+    return features_list, imputed
+
+def _safe_extract(url, budget, started):
+    """(features, imputed, None) on success or (None, None, error body) for a batch item"""
+    try:
+        features_list, imputed = _extract(url, budget, started)
+    except Exception as e:
+        return None, None, {"error": str(e)}
+    error = _check_features(features_list)
+    return (None, None, error) if error else (features_list, imputed, None)
+
+# Request handling shared with async_app, which only swaps in awaitable
+# extraction and scoring
+
+def _quick_result(url, user_id, force_refresh=False):
+    """Cached or confident lexical result for url, or None if it needs the full model"""
+    response = None if force_refresh else _cached_result(url, user_id)
+    if response is None:
+        response = _lexical_result(url, user_id)
+        if response is not None:
+            result_cache.set(_cache_key(url), response)
+    return response
+
+def _full_result(url, user_id, features_list, prediction, proba, imputed):
+    response = _build_result(url, user_id, features_list, prediction, proba, imputed)
+    if lexical_scorer is not None:
+        response["tier"] = "full"
+    _remember(url, response)
+    return response
+
+def _record_checks(started, responses, block=True):
+    for response in responses:
+        _finish_check(response, started)
+    if mongodb_connected:
+        check_writer.put_many((_db_entry(r) for r in responses), block=block)
+
+def _plan_batch(urls, user_id, force_refresh=False):
+    """(unique, results, misses) for a batch: each distinct URL once by
+    normalized key, the results the cache or lexical tier already has, and
+    the keys left to analyze"""
+    unique = {}
+    for url in urls:
+        if isinstance(url, str) and url.strip():
+            unique.setdefault(_normalize_url(url), url)
+    results = {}
+    for key, url in unique.items():
+        quick = _quick_result(url, user_id, force_refresh)
+        if quick is not None:
+            results[key] = quick
+    misses = [key for key in unique if key not in results]
+    logger.debug(f"Batch: {len(urls)} URLs ({len(unique)} unique, {len(misses)} to analyze)")
+    return unique, results, misses
+
+def _split_extracted(misses, extracted):
+    """(errors, scorable, rows) from the _safe_extract result of each missed key"""
+    errors = {key: extracted[key][2] for key in misses if extracted[key][2]}
+    scorable = [key for key in misses if key not in errors]
+    return errors, scorable, [extracted[key][0] for key in scorable]
+
+def _add_full_results(results, unique, user_id, scorable, rows, extracted, predictions, probas):
+    for i, key in enumerate(scorable):
+        results[key] = _full_result(unique[key], user_id, rows[i], predictions[i],
+                                    probas[i] if probas is not None else None, extracted[key][1])
+
+def _batch_body(urls, unique, results, errors):
+    """/predict/batch response: one item per requested URL, in order"""
+    items = []
+    for url in urls:
+        if not isinstance(url, str) or not url.strip():
+            items.append({"url": url, "error": "Invalid URL"})
+            continue
+        key = _normalize_url(url)
+        if key in results:
+            items.append(dict(results[key], url=url))
+        else:
+            items.append({"url": url, **errors[key]})
+
+    failed = sum(1 for item in items if "error" in item)
+    return {
+        "results": items,
+        "count": len(items),
+        "unique": len(unique),
+        "succeeded": len(items) - failed,
+        "failed": failed
+    }
+
 @app.route("/predict", methods=["POST"])
 def predict():
+    started = time.perf_counter()
+    url = None
     try:
         data = request.get_json(silent=True) or {}
         url = data.get("url")
@@ -121,113 +571,71 @@ def predict():
 
         if not url:
             return jsonify({"error": "No URL provided"}), 400
+        try:
+            budget = _request_budget(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        response = _quick_result(url, user_id, data.get("force_refresh"))
+        if response is not None:
+            _record_checks(started, [response])
+            return jsonify(response)
 
-        print(f"\n{'='*60}")
-        print(f"Analyzing: {url}")
-        print(f"{'='*60}")
+        features_list, imputed = _extract(url, budget, started)
+        error = _check_features(features_list)
+        if error:
+            return jsonify(error), 500
 
-        features_list = extract_features(url)
+        with STAGE_SECONDS.labels("score").time():
+            prediction, proba = scorer.score_one(features_list)
+        response = _full_result(url, user_id, features_list, prediction, proba, imputed)
+        _record_checks(started, [response])
+
+        return jsonify(response)
+
+    except Exception as e:
+        logger.exception("predict failed", extra={"fields": {"url": url}})
+        return jsonify({"error": str(e)}), 500
 
-        if not isinstance(features_list, (list, tuple)):
-            return jsonify({"error": "Feature extraction failed"}), 500
-        
-        if len(features_list) != len(FEATURE_NAMES):
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    started = time.perf_counter()
+    try:
+        data = request.get_json(silent=True) or {}
+        urls = data.get("urls")
+        user_id = data.get("user", "anonymous")
+
+        if not isinstance(urls, list) or not urls:
+            return jsonify({"error": "No URLs provided"}), 400
+        if len(urls) > BATCH_MAX_URLS:
             return jsonify({
-                "error": "Feature length mismatch",
-                "expected": len(FEATURE_NAMES),
-                "got": len(features_list)
-            }), 500
-
-        # Show extracted features
-        print(f"\n{'='*60}")
-        print("EXTRACTED FEATURES:")
-        print(f"{'='*60}")
-        for fname, fval in zip(FEATURE_NAMES, features_list):
-            indicator = "🚨 SUSPICIOUS" if fval == 1 else "✓ OK" if fval == -1 else "⚠️ NEUTRAL"
-            print(f"{fname:30s} = {fval:2d}  {indicator}")
-        print(f"{'='*60}\n")
-
-        features_df = pd.DataFrame([features_list], columns=FEATURE_NAMES)
-        prediction = model.predict(features_df)[0]
-        
-        # Rule-based override for obvious phishing patterns
-        suspicious_count = sum(1 for f in features_list if f == 1)
-        
-        # Override 1: Very young domain (< 7 days) with multiple red flags
-        age_of_domain_idx = FEATURE_NAMES.index('age_of_domain') if 'age_of_domain' in FEATURE_NAMES else -1
-        if age_of_domain_idx != -1 and features_list[age_of_domain_idx] == 1 and suspicious_count >= 4:
-            prediction = 1
-            print("⚠️ OVERRIDE: Very young domain with multiple suspicious features")
-        
-        # Override 2: 100% external resources with young domain
-        request_url_idx = FEATURE_NAMES.index('Request_URL') if 'Request_URL' in FEATURE_NAMES else -1
-        url_anchor_idx = FEATURE_NAMES.index('URL_of_Anchor') if 'URL_of_Anchor' in FEATURE_NAMES else -1
-        if (request_url_idx != -1 and features_list[request_url_idx] == 1 and
-            url_anchor_idx != -1 and features_list[url_anchor_idx] == 1 and
-            age_of_domain_idx != -1 and features_list[age_of_domain_idx] == 1):
-            prediction = 1
-            print("⚠️ OVERRIDE: All external resources + suspicious anchors + young domain")
-        
-        result = "phishing" if prediction == 1 else "legitimate"
-
-        confidence = None
-        phishing_probability = None
-        
-        if hasattr(model, "predict_proba"):
-            proba = model.predict_proba(features_df)[0]
-            classes = list(getattr(model, "classes_", []))
-            
-            if classes:
-                try:
-                    pred_idx = classes.index(prediction)
-                    confidence = round(float(proba[pred_idx]) * 100, 2)
-                except ValueError:
-                    confidence = round(float(max(proba)) * 100, 2)
-                
-                if 1 in classes:
-                    phishing_probability = round(float(proba[classes.index(1)]) * 100, 2)
-            else:
-                confidence = round(float(max(proba)) * 100, 2)
-
-        signals = [FEATURE_NAMES[i] for i, v in enumerate(features_list) if v == 1]
-
-        print(f"\nPREDICTION: {result.upper()}")
-        print(f"Confidence: {confidence}%")
-        print(f"Phishing Probability: {phishing_probability}%")
-        print(f"Suspicious Signals: {signals}\n")
-
-        response = {
-            "url": url,
-            "prediction": result,
-            "confidence": confidence,
-            "phishingProbability": phishing_probability,
-            "signals": signals,
-            "features": dict(zip(FEATURE_NAMES, features_list)),
-            "checkedAt": datetime.now().isoformat(),
-            "user": str(user_id)
-        }
+                "error": "Too many URLs",
+                "max": BATCH_MAX_URLS,
+                "got": len(urls)
+            }), 413
+        try:
+            budget = _request_budget(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        if mongodb_connected:
-            try:
-                db_entry = {
-                    "url": url,
-                    "prediction": result,
-                    "confidence": confidence,
-                    "phishingProbability": phishing_probability,
-                    "signals": signals,
-                    "features": dict(zip(FEATURE_NAMES, features_list)),
-                    "checkedAt": datetime.now(),
-                    "user": str(user_id)
-                }
-                url_checks.insert_one(db_entry)
-            except Exception:
-                pass
+        # Analyze each distinct URL once, however often it appears
+        unique, results, misses = _plan_batch(urls, user_id, data.get("force_refresh"))
 
-        return jsonify(response)
+        # URLs still queued when the budget runs out get only what is left of it
+        extracted = dict(zip(misses, _batch_executor.map(
+            lambda url: _safe_extract(url, budget, started), [unique[k] for k in misses])))
+        errors, scorable, rows = _split_extracted(misses, extracted)
+
+        if scorable:
+            with STAGE_SECONDS.labels("score").time():
+                predictions, probas = scorer.score(rows)
+            _add_full_results(results, unique, user_id, scorable, rows, extracted, predictions, probas)
+
+        _record_checks(started, list(results.values()))
+        return jsonify(_batch_body(urls, unique, results, errors))
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("batch failed")
         return jsonify({"error": str(e)}), 500
 
 @app.route("/health", methods=["GET"])
@@ -235,12 +643,17 @@ def health():
     return jsonify({
         "status": "healthy",
         "model": {
-            "loaded": model is not None,
+            "loaded": scorer is not None,
+            "scorer": type(scorer).__name__,
             "type": MODEL_TYPE,
             "features": len(FEATURE_NAMES),
-            "accuracy": MODEL_ACCURACY
+            "accuracy": MODEL_ACCURACY,
+            "version": MODEL_VERSION
         },
+        "cache": result_cache.stats(),
+        "tiered": {"band": TIER_BAND, "training": TIER_INFO} if lexical_scorer else None,
         "database": mongodb_connected,
+        "write_behind": check_writer.stats() if check_writer else None,
         "timestamp": datetime.now().isoformat()
     })
 
@@ -0,0 +1,238 @@
+"""asyncio variant of the prediction API (aiohttp).
+
+Serves /predict, /predict/batch, /health, /features and /metrics with the model,
+caches, lexical tier and write-behind queue of app.py, but gathers
+features with async_features, so a check waiting on the network holds no
+thread and one process can keep hundreds of checks in flight. The
+dashboard routes (/stats, /stats/timeseries) stay on the WSGI app.
+
+    python async_app.py
+    gunicorn 'async_app:create_app()' -k aiohttp.GunicornWebWorker -c gunicorn.conf.py
+"""
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+
+from aiohttp import web
+
+from metrics import CONTENT_TYPE, REGISTRY, STAGE_SECONDS
+
+import app as api
+from async_features import close_session, extract_features_detailed_async
+from features import _normalize_url
+
+logger = logging.getLogger(__name__)
+
+# Checks analyzed at once per process; the rest wait for a slot
+ASYNC_MAX_IN_FLIGHT = int(os.getenv("ASYNC_MAX_IN_FLIGHT", "500"))
+
+in_flight = 0
+# Extraction task per (normalized URL, budget), awaited by every request that asks for it meanwhile
+_extractions = {}
+
+async def _score(rows):
+    """scorer.score off the event loop; the forest can take milliseconds"""
+    loop = asyncio.get_running_loop()
+    with STAGE_SECONDS.labels("score").time():
+        return await loop.run_in_executor(None, api.scorer.score, rows)
+
+async def _extract_limited(slots, url, budget, started):
+    global in_flight
+    async with slots:
+        in_flight += 1
+        try:
+            # Time spent waiting for a slot comes out of the budget
+            with STAGE_SECONDS.labels("extract").time():
+                return await extract_features_detailed_async(url, api._extraction_timeout(budget, started))
+        finally:
+            in_flight -= 1
+
+async def _extract(request, url, budget, started):
+    """(features, imputed) for url within the request's budget, joining an
+    extraction of the same URL with the same budget already in progress"""
+    key = (_normalize_url(url), budget)
+    task = _extractions.get(key)
+    if task is None:
+        task = _extractions[key] = asyncio.ensure_future(
+            _extract_limited(request.app["slots"], url, budget, started))
+        task.add_done_callback(lambda _: _extractions.pop(key, None))
+        return await asyncio.shield(task)
+    api.COALESCED.inc()
+    # Shielded: a waiter that goes away must not cancel the extraction for the others
+    features_list, imputed = await asyncio.shield(task)
+    return list(features_list), list(imputed)
+
+async def _analyze(request, url, budget, started):
+    """(features, imputed, None) or (None, None, error body) for one URL, within the in-flight limit"""
+    try:
+        features_list, imputed = await _extract(request, url, budget, started)
+    except Exception as e:
+        return None, None, {"error": str(e)}
+    error = api._check_features(features_list)
+    return (None, None, error) if error else (features_list, imputed, None)
+
+def _record(started, *responses):
+    # Runs on the event loop: a full queue drops the record rather than
+    # stalling every other request, whatever WRITE_BEHIND_POLICY says
+    api._record_checks(started, responses, block=False)
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return {}
+
+async def home(request):
+    return web.json_response({
+        "message": "Phishing Detection API",
+        "status": "online",
+        "mode": "async",
+        "model": {
+            "type": api.MODEL_TYPE,
+            "features": len(api.FEATURE_NAMES),
+            "accuracy": api.MODEL_ACCURACY,
+        },
+        "database": "connected" if api.mongodb_connected else "disconnected",
+    })
+
+async def predict(request):
+    started = time.perf_counter()
+    data = await _json_body(request)
+    url = data.get("url")
+    user_id = data.get("user", "anonymous")
+    if not url:
+        return web.json_response({"error": "No URL provided"}, status=400)
+    try:
+        budget = api._request_budget(data)
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+
+    try:
+        response = api._quick_result(url, user_id, data.get("force_refresh"))
+        if response is not None:
+            _record(started, response)
+            return web.json_response(response)
+
+        features_list, imputed, error = await _analyze(request, url, budget, started)
+        if error:
+            return web.json_response(error, status=500)
+
+        predictions, probas = await _score([features_list])
+        response = api._full_result(url, user_id, features_list, predictions[0],
+                                    probas[0] if probas is not None else None, imputed)
+        _record(started, response)
+        return web.json_response(response)
+    except Exception as e:
+        logger.exception("predict failed", extra={"fields": {"url": url}})
+        return web.json_response({"error": str(e)}, status=500)
+
+async def predict_batch(request):
+    started = time.perf_counter()
+    data = await _json_body(request)
+    urls = data.get("urls")
+    user_id = data.get("user", "anonymous")
+    if not isinstance(urls, list) or not urls:
+        return web.json_response({"error": "No URLs provided"}, status=400)
+    if len(urls) > api.BATCH_MAX_URLS:
+        return web.json_response({"error": "Too many URLs", "max": api.BATCH_MAX_URLS, "got": len(urls)},
+                                 status=413)
+    try:
+        budget = api._request_budget(data)
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+
+    try:
+        # Analyze each distinct URL once, however often it appears
+        unique, results, misses = api._plan_batch(urls, user_id, data.get("force_refresh"))
+
+        extracted = dict(zip(misses, await asyncio.gather(
+            *(_analyze(request, unique[k], budget, started) for k in misses))))
+        errors, scorable, rows = api._split_extracted(misses, extracted)
+
+        if scorable:
+            predictions, probas = await _score(rows)
+            api._add_full_results(results, unique, user_id, scorable, rows, extracted, predictions, probas)
+        _record(started, *results.values())
+
+        return web.json_response(api._batch_body(urls, unique, results, errors))
+    except Exception as e:
+        logger.exception("batch failed")
+        return web.json_response({"error": str(e)}, status=500)
+
+async def health(request):
+    return web.json_response({
+        "status": "healthy",
+        "mode": "async",
+        "in_flight": in_flight,
+        "model": {
+            "loaded": api.scorer is not None,
+            "scorer": type(api.scorer).__name__,
+            "type": api.MODEL_TYPE,
+            "features": len(api.FEATURE_NAMES),
+            "accuracy": api.MODEL_ACCURACY,
+            "version": api.MODEL_VERSION,
+        },
+        "cache": api.result_cache.stats(),
+        "database": api.mongodb_connected,
+        "write_behind": api.check_writer.stats() if api.check_writer else None,
+        "timestamp": datetime.now().isoformat(),
+    })
+
+async def list_features(request):
+    return web.json_response({"features": api.FEATURE_NAMES, "count": len(api.FEATURE_NAMES)})
+
+async def metrics(request):
+    return web.Response(body=REGISTRY.render(), headers={"Content-Type": CONTENT_TYPE})
+
+@web.middleware
+async def timing(request, handler):
+    route = request.match_info.route.resource
+    endpoint = route.canonical if route is not None else "unmatched"
+    start = time.perf_counter()
+    status = 500
+    api.REQUESTS_IN_FLIGHT.labels(endpoint).inc()
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        api.REQUESTS_IN_FLIGHT.labels(endpoint).dec()
+        api.REQUEST_SECONDS.labels(endpoint, str(status)).observe(time.perf_counter() - start)
+
+@web.middleware
+async def cors(request, handler):
+    if request.method == "OPTIONS":
+        response = web.Response()
+    else:
+        response = await handler(request)
+    origin = request.headers.get("Origin")
+    if origin and ("*" in api.ALLOWED_ORIGINS or origin in api.ALLOWED_ORIGINS):
+        response.headers["Access-Control-Allow-Origin"] = origin
+        response.headers["Access-Control-Allow-Credentials"] = "true"
+        response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+        response.headers["Vary"] = "Origin"
+    return response
+
+async def _on_cleanup(application):
+    await close_session()
+    api.shutdown_worker()
+
+def create_app():
+    application = web.Application(middlewares=[timing, cors])
+    application["slots"] = asyncio.Semaphore(ASYNC_MAX_IN_FLIGHT)
+    application.router.add_get("/", home)
+    application.router.add_post("/predict", predict)
+    application.router.add_post("/predict/batch", predict_batch)
+    application.router.add_get("/health", health)
+    application.router.add_get("/features", list_features)
+    application.router.add_get("/metrics", metrics)
+    application.on_cleanup.append(_on_cleanup)
+    return application
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host="0.0.0.0", port=int(os.getenv("PORT", 7000)))
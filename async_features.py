@@ -0,0 +1,243 @@
+"""asyncio versions of the network feature probes in features.py.
+
+One event loop can hold hundreds of checks in flight: the page is fetched
+with aiohttp, hosts are resolved through the shared features.resolver
+(its lookups already run off-thread and are awaited here), TLS handshakes
+use TLSProbe.check_async, and only WHOIS, which has no async client, and
+the Selenium fallback run on small thread pools of their own. Caches are shared with the blocking probes, and
+verdicts come from the same helpers, so both paths give the same features.
+
+aiohttp is only needed for this module (listed in requirements.txt).
+"""
+import os
+import time
+import socket
+import asyncio
+import logging
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+
+from metrics import PROBE_ERRORS, STAGE_SECONDS
+from probe_guard import ProbeRejected
+from features import (
+    BROWSER_HEADERS, BROWSER_POOL_SIZE, DNS_TIMEOUT, FEATURE_SECONDS, FEATURES,
+    HTML_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_POOL_HOSTS, HTTP_POOL_PER_HOST, BodyScanner, PageContext,
+    host_guard, _REJECTED,
+    _age_verdict, _fetch_html_selenium, _finish_extraction, _is_html, _normalize_url, _parsed,
+    _registration_verdict, _safe_whois, _ssl_verdict, _start_extraction, _timed,
+    ageOfDomain, dnsRecord, domainRegistrationLength, resolver, SSLfinalState, tls_probe,
+)
+
+logger = logging.getLogger(__name__)
+
+WHOIS_WORKERS = int(os.getenv("WHOIS_WORKERS", "16"))
+
+_whois_executor = ThreadPoolExecutor(max_workers=WHOIS_WORKERS, thread_name_prefix="whois")
+# One thread per pooled browser: a blocked page waiting on a lease must not
+# hold the default executor that scoring runs on
+_selenium_executor = ThreadPoolExecutor(max_workers=BROWSER_POOL_SIZE, thread_name_prefix="selenium")
+_session = None
+
+async def _lookup(host, timeout=DNS_TIMEOUT):
+    """Address list from the shared resolver; raises socket.gaierror or TimeoutError"""
+    future = asyncio.wrap_future(resolver.resolve_async(host))
+    # Shielded: other callers may be waiting on the same lookup
+    return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+class SharedResolver(AbstractResolver):
+    """aiohttp resolver backed by the shared features.resolver cache"""
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        try:
+            addresses = await _lookup(host)
+        except TimeoutError as e:
+            raise OSError(f"DNS lookup for {host} timed out") from e
+        return [
+            {
+                "hostname": host,
+                "host": address,
+                "port": port,
+                "family": socket.AF_INET6 if ":" in address else socket.AF_INET,
+                "proto": 0,
+                "flags": socket.AI_NUMERICHOST,
+            }
+            for address in addresses
+        ]
+
+    async def close(self):
+        pass
+
+def get_session():
+    """aiohttp session for the running loop, created on first use"""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            resolver=SharedResolver(),
+            limit=HTTP_POOL_HOSTS * HTTP_POOL_PER_HOST,
+            limit_per_host=HTTP_POOL_PER_HOST,
+            use_dns_cache=False,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            headers=BROWSER_HEADERS,
+            cookie_jar=aiohttp.DummyCookieJar(),
+        )
+    return _session
+
+async def close_session():
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+async def fetch_html(url):
+    """(page, None) like features._fetch_html, without blocking the loop"""
+    u = _normalize_url(url)
+    p = urlparse(u)
+    timeout = aiohttp.ClientTimeout(total=HTML_TIMEOUT, sock_connect=HTTP_CONNECT_TIMEOUT)
+    try:
+        host_guard.acquire(p.hostname or "")
+        with STAGE_SECONDS.labels("html_fetch").time():
+            async with get_session().get(u, ssl=False, timeout=timeout) as r:
+                host_guard.success(p.hostname or "")
+                logger.debug(f"HTTP Status: {r.status}")
+                if r.status == 200:
+                    if not _is_html(r):
+                        logger.warning(f"Not an HTML page: {r.headers.get('Content-Type')}")
+                        return None, None
+                    body = BodyScanner(r.headers)
+                    async for chunk in r.content.iter_chunked(64 * 1024):
+                        if not body.feed(chunk):
+                            break
+                    return body.close(), None
+                elif r.status != 403:
+                    logger.warning(f"Non-200 status code: {r.status}")
+                    return None, None
+        logger.warning(f"403 Forbidden - Trying Selenium...")
+    except ProbeRejected:
+        raise
+    except (aiohttp.ClientError, TimeoutError) as e:
+        PROBE_ERRORS.labels("html").inc()
+        # A name that didn't resolve says nothing about the host
+        if isinstance(e, (aiohttp.ClientConnectionError, TimeoutError)) \
+                and not isinstance(e, aiohttp.ClientConnectorDNSError):
+            host_guard.failure(p.hostname or "")
+        logger.warning(f"Request failed: {e} - Trying Selenium...")
+    except Exception as e:
+        logger.warning(f"Failed to fetch HTML: {e}")
+        return None, None
+    return await asyncio.get_running_loop().run_in_executor(_selenium_executor, _fetch_html_selenium, url)
+
+async def _whois(domain):
+    return await asyncio.get_running_loop().run_in_executor(_whois_executor, _safe_whois, domain)
+
+async def ssl_final_state(url):
+    _, p, _, host, _ = _parsed(url)
+    if p.scheme != "https":
+        logger.debug(f"SSLfinalState: 1 (no HTTPS)")
+        return 1
+    return _ssl_verdict(await tls_probe.check_async(host, p.port or 443))
+
+async def domain_registration_length(url):
+    reg_domain = _parsed(url)[4]
+    if not reg_domain:
+        logger.debug(f"domainRegistrationLength: 1 (no domain)")
+        return 1
+    return _registration_verdict(await _whois(reg_domain))
+
+async def age_of_domain(url):
+    reg_domain = _parsed(url)[4]
+    if not reg_domain:
+        logger.debug(f"ageOfDomain: 1 (no domain)")
+        return 1
+    return _age_verdict(await _whois(reg_domain))
+
+async def dns_record(url):
+    host = _parsed(url)[3]
+    if not host:
+        logger.debug(f"dnsRecord: 1 (no host)")
+        return 1
+    try:
+        await _lookup(host)
+        logger.debug(f"dnsRecord: -1 (DNS OK)")
+        return -1
+    except socket.gaierror:
+        logger.debug(f"dnsRecord: 1 (no DNS)")
+        return 1
+    except ProbeRejected:
+        raise
+    except Exception as e:
+        logger.warning(f"dnsRecord: 0 (check failed: {e})")
+        return 0
+
+# Async counterpart of each "net" feature in features.FEATURES
+ASYNC_PROBES = {
+    SSLfinalState: ssl_final_state,
+    domainRegistrationLength: domain_registration_length,
+    ageOfDomain: age_of_domain,
+    dnsRecord: dns_record,
+}
+
+async def _guarded(name, default, coro):
+    start = time.perf_counter()
+    try:
+        return await coro
+    except asyncio.CancelledError:
+        raise
+    except ProbeRejected as e:
+        logger.debug(f"{name}: skipped ({e})")
+        return _REJECTED
+    except Exception as e:
+        logger.error(f"{name} error: {e}")
+        return default
+    finally:
+        FEATURE_SECONDS.labels(name).observe(time.perf_counter() - start)
+
+async def _page_feature(fn, url, page):
+    soup, response = await asyncio.shield(page)
+    return fn(url, PageContext.loaded(url, soup, response))
+
+async def extract_features_async(url, timeout=None):
+    """extract_features() on the running event loop.
+
+    Probes still running after `timeout` seconds (FEATURE_DEADLINE by
+    default) are cancelled and given their fallback value.
+    """
+    return (await extract_features_detailed_async(url, timeout))[0]
+
+async def extract_features_detailed_async(url, timeout=None):
+    """extract_features_async() plus the names of the features given their
+    fallback value, at the deadline or because their probe was rejected:
+    (features, imputed)"""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline = _start_extraction(url, timeout)
+    # With no time left, start no probes: their results would be thrown away
+    probing = deadline > 0
+
+    page = asyncio.ensure_future(fetch_html(url)) if probing else None
+    features = [None] * len(FEATURES)
+    pending = {}
+    for i, (name, fn, default, kind) in enumerate(FEATURES):
+        if kind == "url" or not probing:
+            continue
+        coro = ASYNC_PROBES[fn](url) if kind == "net" else _page_feature(fn, url, page)
+        pending[asyncio.ensure_future(_guarded(name, default, coro))] = i
+
+    for i, (name, fn, _, kind) in enumerate(FEATURES):
+        if kind == "url":
+            features[i] = _timed(name, fn, url)
+
+    remaining = max(0.0, deadline - (loop.time() - start))
+    done, not_done = await asyncio.wait(pending, timeout=remaining) if pending else (set(), set())
+    rejected = [pending[task] for task in done if task.result() is _REJECTED]
+    for task in done:
+        features[pending[task]] = task.result()
+    for task in not_done:
+        task.cancel()
+    if page is not None:
+        page.cancel()
+    return features, _finish_extraction(features, deadline, rejected, [pending[task] for task in not_done])
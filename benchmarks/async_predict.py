@@ -0,0 +1,130 @@
+"""How many slow checks the threaded and the asyncio API keep in flight.
+
+A local stub site answers every page after a fixed delay. Both servers
+are started on it: the WSGI app under gunicorn (one gthread worker) and
+async_app.py (one process). Each is sent the same number of concurrent
+/predict requests for distinct pages; the report shows throughput,
+latency and the peak number of page fetches the stub saw at once.
+
+    python -m benchmarks.async_predict [--requests 400] [--concurrency 200] [--delay-ms 1000]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+import subprocess
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks.load_test import wait_until_up
+
+class SlowSite:
+    """Serves a small page after `delay` seconds, counting concurrent requests"""
+
+    PAGE = (b"<html><head><script src='/app.js'></script></head><body>"
+            b"<a href='/home'>home</a><img src='/logo.png'><form action='/login'></form></body></html>")
+
+    def __init__(self, port, delay):
+        self.port = port
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    async def page(self, request):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return web.Response(body=self.PAGE, content_type="text/html")
+        finally:
+            self.active -= 1
+
+    def start(self):
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            application = web.Application()
+            application.router.add_get("/{tail:.*}", self.page)
+            runner = web.AppRunner(application, access_log=None)
+            loop.run_until_complete(runner.setup())
+            loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", self.port).start())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the threaded and asyncio APIs on slow pages")
+    parser.add_argument("--requests", type=int, default=400, help="checks per mode")
+    parser.add_argument("--concurrency", type=int, default=200, help="client requests in flight")
+    parser.add_argument("--delay-ms", type=float, default=1000, help="stub page response time")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads for the threaded mode")
+    parser.add_argument("--port", type=int, default=7200)
+    return parser.parse_args(argv)
+
+async def run_load(base, site, run, n, concurrency):
+    slots = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(session, i):
+        nonlocal errors
+        async with slots:
+            t = time.perf_counter()
+            url = f"http://127.0.0.1:{site.port}/{run}/page/{i}"
+            try:
+                async with session.post(f"{base}/predict", json={"url": url}) as r:
+                    await r.read()
+                    ok = r.status == 200
+            except aiohttp.ClientError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - t)
+            else:
+                errors += 1
+
+    site.peak = 0
+    timeout = aiohttp.ClientTimeout(total=None)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency), timeout=timeout) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(session, i) for i in range(n)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0
+    return len(latencies) / elapsed, pct(0.5), pct(0.95), site.peak, errors
+
+def main(argv=None):
+    args = parse_args(argv)
+    site = SlowSite(args.port + 1, args.delay_ms / 1000)
+    site.start()
+
+    # The lookup-table scorer keeps scoring CPU out of the comparison, and
+    # every page is on one host, so lift the per-host connection cap
+    env = dict(os.environ, BROWSER_POOL_WARM="0", MONGODB_URI="", GUNICORN_ACCESS_LOG="",
+               PORT=str(args.port), SCORER="lut", HTTP_POOL_PER_HOST=str(args.concurrency))
+    modes = {
+        "threaded": [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--workers", "1",
+                     "--threads", str(args.threads), "--bind", f"127.0.0.1:{args.port}", "wsgi:app"],
+        "asyncio": [sys.executable, "async_app.py"],
+    }
+    print(f"{args.requests} checks, {args.concurrency} at a time, pages take {args.delay_ms:.0f} ms")
+    for mode, cmd in modes.items():
+        proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            base = f"http://127.0.0.1:{args.port}"
+            wait_until_up(base, proc)
+            rps, p50, p95, peak, errors = asyncio.run(
+                run_load(base, site, mode, args.requests, args.concurrency))
+            print(f"{mode:>9}: {rps:7.1f} req/s   p50 {p50:8.1f} ms   p95 {p95:8.1f} ms   "
+                  f"peak fetches in flight {peak:4d}   errors {errors}")
+        finally:
+            proc.terminate()
+            proc.wait(timeout=60)
+
+if __name__ == "__main__":
+    main()
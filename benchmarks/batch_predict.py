@@ -0,0 +1,46 @@
+"""Throughput of /predict/batch vs. looping over /predict.
+
+Feature extraction is replaced by a stub that sleeps for a fixed time,
+standing in for the network probes, so the numbers show what batching
+(parallel extraction plus one scoring call) buys over sequential calls.
+
+    python -m benchmarks.batch_predict [urls] [probe_ms]
+"""
+import sys
+import time
+import random
+import logging
+
+import app as api
+
+def stub_extractor(delay):
+    def extract(url, timeout=None):
+        time.sleep(delay)
+        rng = random.Random(url)
+        return [rng.choice((-1, 0, 1)) for _ in api.FEATURE_NAMES], []
+    return extract
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    api.extract_features_detailed = stub_extractor(delay)
+    api.mongodb_connected = False
+    logging.disable(logging.CRITICAL)
+    client = api.app.test_client()
+    urls = [f"http://bench-{i}.example.com/login" for i in range(n)]
+
+    t = time.perf_counter()
+    for url in urls:
+        assert client.post("/predict", json={"url": url, "force_refresh": True}).status_code == 200
+    loop = time.perf_counter() - t
+
+    t = time.perf_counter()
+    assert client.post("/predict/batch", json={"urls": urls, "force_refresh": True}).status_code == 200
+    batch = time.perf_counter() - t
+
+    print(f"{n} URLs, {delay * 1000:.0f} ms per extraction, {api.BATCH_WORKERS} batch workers")
+    print(f"loop over /predict  {loop:7.3f} s  {n / loop:8.1f} URLs/s")
+    print(f"/predict/batch      {batch:7.3f} s  {n / batch:8.1f} URLs/s  ({loop / batch:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Extractions run for a burst of concurrent /predict calls on one URL.
+
+Feature extraction is replaced by a stub that sleeps for a fixed time and
+counts its calls. A burst of threads posts the same URL (force_refresh,
+so the result cache plays no part), first with every request extracting
+on its own and then with concurrent requests coalesced.
+
+    python -m benchmarks.coalescing [requests] [probe_ms]
+"""
+import os
+import sys
+import time
+import random
+import logging
+import threading
+
+# Keep the forest's scoring CPU out of the comparison
+os.environ.setdefault("SCORER", "lut")
+
+import app as api
+from cache import SingleFlight
+
+class Uncoalesced:
+    def do(self, key, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+def counting_extractor(delay, calls):
+    def extract(url, timeout=None):
+        calls.append(url)
+        time.sleep(delay)
+        rng = random.Random(url)
+        return [rng.choice((-1, 0, 1)) for _ in api.FEATURE_NAMES], []
+    return extract
+
+def burst(n, url):
+    client = api.app.test_client()
+    start = threading.Barrier(n)
+    statuses = []
+
+    def one():
+        start.wait()
+        statuses.append(client.post("/predict", json={"url": url, "force_refresh": True}).status_code)
+
+    threads = [threading.Thread(target=one) for _ in range(n)]
+    t = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == [200] * n, statuses
+    return time.perf_counter() - t
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 500) / 1000
+    api.mongodb_connected = False
+    logging.disable(logging.CRITICAL)
+
+    for label, flight in (("per request", Uncoalesced()), ("coalesced", SingleFlight())):
+        calls = []
+        api.extract_features_detailed = counting_extractor(delay, calls)
+        api._extractions = flight
+        elapsed = burst(n, "http://campaign.example.com/verify-account")
+        print(f"{label:>12}: {len(calls):4d} extractions for {n} requests in {elapsed * 1000:7.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Per-request latency of fresh connections vs. the pooled features._http client.
+
+Serves a small page from a local keep-alive HTTP server and fetches it
+repeatedly, first the old way (a bare requests.get per call) and then
+through the shared session used by features.py.
+
+    python -m benchmarks.http_pool [requests]
+"""
+import sys
+import time
+import threading
+import statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from features import _http
+
+PAGE = b"<html><head><title>bench</title></head><body>" + b"<a href='/x'>x</a>" * 50 + b"</body></html>"
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+def timed(fn, url, n):
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        fn(url, timeout=5).content
+        samples.append((time.perf_counter() - t) * 1000)
+    return samples
+
+def report(label, samples):
+    samples = sorted(samples)
+    print(f"{label:20s} mean {statistics.mean(samples):7.3f} ms   "
+          f"p50 {samples[len(samples) // 2]:7.3f} ms   "
+          f"p95 {samples[int(len(samples) * 0.95)]:7.3f} ms")
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    try:
+        report("fresh requests.get", timed(requests.get, url, n))
+        report("pooled session", timed(_http.get, url, n))
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
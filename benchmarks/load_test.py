@@ -0,0 +1,132 @@
+"""Throughput of /predict under gunicorn as the number of workers grows.
+
+For each worker count a gunicorn server is started with gunicorn.conf.py
+on a stub app whose feature extraction sleeps for a fixed time (standing
+in for the network probes) before the real model scores the URL. Client
+threads then post unique URLs for a fixed time and requests per second
+and latency percentiles are reported. With --url, an already running
+server is load-tested instead.
+
+    python -m benchmarks.load_test --workers 1 2 4 --concurrency 32
+    python -m benchmarks.load_test --url http://localhost:7000 --duration 30
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import itertools
+import threading
+import subprocess
+
+import requests
+
+def create_stub_app(probe_ms=50):
+    """gunicorn app factory: the real API with stubbed feature extraction"""
+    import app as api
+
+    delay = float(probe_ms) / 1000
+
+    def extract(url, timeout=None):
+        time.sleep(delay)
+        rng = random.Random(url)
+        return [rng.choice((-1, 0, 1)) for _ in api.FEATURE_NAMES], []
+
+    api.extract_features_detailed = extract
+    return api.app
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test /predict under gunicorn")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker counts to compare")
+    parser.add_argument("--threads", type=int, default=8, help="threads per worker")
+    parser.add_argument("--concurrency", type=int, default=32, help="client threads")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load per run")
+    parser.add_argument("--probe-ms", type=float, default=50, help="stubbed feature extraction time")
+    parser.add_argument("--port", type=int, default=7100)
+    parser.add_argument("--url", help="load-test this running server instead of starting one")
+    return parser.parse_args(argv)
+
+def wait_until_up(base, proc, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {proc.returncode}")
+        try:
+            if requests.get(f"{base}/health", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{base} did not come up within {timeout}s")
+
+def run_load(base, concurrency, duration):
+    counter = itertools.count()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    stop = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        mine, failed = [], 0
+        while time.monotonic() < stop:
+            url = f"http://load-{next(counter)}.example.com/login"
+            t = time.perf_counter()
+            try:
+                ok = session.post(f"{base}/predict", json={"url": url}, timeout=60).status_code == 200
+            except requests.RequestException:
+                ok = False
+            if ok:
+                mine.append(time.perf_counter() - t)
+            else:
+                failed += 1
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0
+    return len(latencies) / elapsed, pct(0.5), pct(0.95), sum(errors)
+
+def start_server(args, workers):
+    env = dict(os.environ, BROWSER_POOL_WARM="0", MONGODB_URI="", GUNICORN_ACCESS_LOG="")
+    cmd = [
+        sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+        "--workers", str(workers), "--threads", str(args.threads),
+        "--bind", f"127.0.0.1:{args.port}",
+        f"benchmarks.load_test:create_stub_app(probe_ms={args.probe_ms})",
+    ]
+    return subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def report(label, result):
+    rps, p50, p95, errors = result
+    print(f"{label:>12}: {rps:8.1f} req/s   p50 {p50:7.1f} ms   p95 {p95:7.1f} ms   errors {errors}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"{args.concurrency} clients for {args.duration:.0f}s each; {os.cpu_count()} cores")
+    if args.url:
+        wait_until_up(args.url, None)
+        report("server", run_load(args.url, args.concurrency, args.duration))
+        return
+
+    for workers in args.workers:
+        proc = start_server(args, workers)
+        try:
+            base = f"http://127.0.0.1:{args.port}"
+            wait_until_up(base, proc)
+            report(f"{workers} workers", run_load(base, args.concurrency, args.duration))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Requests/sec of /predict with logging off, at INFO and at DEBUG.
+
+Pages are served by a local HTTP server and every request runs the real
+feature extraction (force_refresh skips the result cache). Log output
+goes to a file, as it would under a log collector; the timings cover the
+request path only, since writing happens on the queue's listener thread.
+
+    python -m benchmarks.logging_overhead [requests]
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+os.environ.setdefault("MONGODB_URI", "")
+os.environ.setdefault("BROWSER_POOL_WARM", "0")
+
+import app as api
+from benchmarks.http_pool import Handler
+from logging_config import configure_logging, dropped_records, flush_logging
+
+MODES = (
+    ("off", "CRITICAL", "text"),
+    ("INFO json", "INFO", "json"),
+    ("INFO text", "INFO", "text"),
+    ("DEBUG text", "DEBUG", "text"),
+)
+
+def run(client, url, n):
+    start = time.perf_counter()
+    for i in range(n):
+        r = client.post("/predict", json={"url": f"{url}?i={i}", "force_refresh": True})
+        assert r.status_code == 200, r.get_json()
+    return n / (time.perf_counter() - start)
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/page"
+    client = api.app.test_client()
+
+    try:
+        with tempfile.TemporaryFile("w") as sink:
+            configure_logging("CRITICAL", stream=sink)
+            run(client, url, 20)  # warm up connections and caches
+            for label, level, fmt in MODES:
+                configure_logging(level, fmt, stream=sink)
+                before = sink.tell()
+                rps = run(client, url, n)
+                flush_logging()
+                per_check = (sink.tell() - before) / n
+                print(f"{label:>10}: {rps:7.1f} req/s   {per_check:7.0f} log bytes/check   "
+                      f"dropped {dropped_records()}")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Per-call scoring latency: the old DataFrame path vs. the scoring module.
+
+The old path is what /predict used to do for one row: build a one-row
+DataFrame, then call predict() and predict_proba() on it. Scorer writes
+the row into a preallocated array and calls predict_proba() once;
+LookupTableScorer reads the answer from a precomputed table.
+
+    python -m benchmarks.scoring [model_path] [calls]
+"""
+import sys
+import time
+import random
+import warnings
+import statistics
+
+import pandas as pd
+
+from scoring import LookupTableScorer, Scorer, load_model
+
+def old_path(model, feature_names, row):
+    features_df = pd.DataFrame([row], columns=feature_names)
+    model.predict(features_df)[0]
+    model.predict_proba(features_df)[0]
+
+def timed(fn, rows):
+    fn(rows[0])
+    samples = []
+    for row in rows:
+        t = time.perf_counter()
+        fn(row)
+        samples.append((time.perf_counter() - t) * 1000)
+    return samples
+
+def report(label, samples):
+    samples = sorted(samples)
+    print(f"{label:28s} mean {statistics.mean(samples):8.3f} ms   "
+          f"p50 {samples[len(samples) // 2]:8.3f} ms   "
+          f"p95 {samples[int(len(samples) * 0.95)]:8.3f} ms")
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "models/phishing_model_optimized.pkl"
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    warnings.filterwarnings("ignore")
+    rng = random.Random(0)
+
+    model, feature_names, _, _ = load_model(path)
+    rows = [[rng.choice((-1, 0, 1)) for _ in feature_names] for _ in range(n)]
+    report("DataFrame + predict + proba", timed(lambda r: old_path(model, feature_names, r), rows))
+
+    # A fresh copy, since Scorer tunes the model it wraps
+    model, feature_names, _, _ = load_model(path)
+    scorer = Scorer(model, feature_names)
+    report("Scorer.score_one", timed(scorer.score_one, rows))
+
+    table = LookupTableScorer.from_scorer(scorer)
+    table.verify(scorer)
+    report("LookupTableScorer.score_one", timed(table.score_one, rows))
+
+if __name__ == "__main__":
+    main()
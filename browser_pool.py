@@ -0,0 +1,131 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class BrowserPoolExhausted(Exception):
+    """Raised when no browser could be leased before the timeout"""
+
+class BrowserPool:
+    """Bounded pool of long-lived browser sessions.
+
+    Sessions are created by `factory` on demand (or up front with warm()),
+    handed out one fetch at a time, and recycled after `max_pages` fetches
+    or when a caller reports the session as broken. When every session is
+    busy, acquire() waits up to `lease_timeout` seconds before giving up.
+    """
+
+    def __init__(self, factory, size=2, max_pages=50, lease_timeout=10):
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self.lease_timeout = lease_timeout
+        self._idle = []
+        self._pages = {}
+        self._created = 0
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def warm(self, count=None):
+        """Start sessions up front so the first fetches don't pay for startup"""
+        count = self.size if count is None else min(count, self.size)
+        started = 0
+        while True:
+            with self._cond:
+                if self._closed or self._created >= count:
+                    break
+                self._created += 1
+            driver = self._create()
+            if driver is None:
+                break
+            with self._cond:
+                self._idle.append(driver)
+                self._cond.notify()
+            started += 1
+        logger.info(f"Browser pool: warmed {started} session(s)")
+        return started
+
+    def acquire(self, timeout=None):
+        timeout = self.lease_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise BrowserPoolExhausted("browser pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise BrowserPoolExhausted(
+                        f"all {self.size} browser sessions busy ({self._waiting} waiting)"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        driver = self._create()
+        if driver is None:
+            raise BrowserPoolExhausted("could not start a browser session")
+        return driver
+
+    def release(self, driver, discard=False):
+        """Return a leased session; broken or worn-out sessions are replaced"""
+        with self._cond:
+            pages = self._pages.get(id(driver), 0) + 1
+            if not (discard or pages >= self.max_pages or self._closed):
+                self._pages[id(driver)] = pages
+                self._idle.append(driver)
+                self._cond.notify()
+                return
+        self._destroy(driver)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for driver in idle:
+            self._destroy(driver)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "idle": len(self._idle),
+                "busy": self._created - len(self._idle),
+                "waiting": self._waiting,
+            }
+
+    def _create(self):
+        try:
+            driver = self.factory()
+        except Exception as e:
+            logger.warning(f"Browser pool: failed to start session - {e}")
+            driver = None
+        if driver is None:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            return None
+        with self._cond:
+            self._pages[id(driver)] = 0
+        return driver
+
+    def _destroy(self, driver):
+        with self._cond:
+            self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
@@ -1,12 +1,21 @@
+import os
 import re
+import codecs
+import atexit
+import time
 import socket
+import threading
 import ipaddress
+from functools import lru_cache
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, wait
 import tldextract
 import whois
 import requests
+from http.cookiejar import DefaultCookiePolicy
+from urllib3.util.retry import Retry
+from urllib3.exceptions import NameResolutionError
 from datetime import datetime, timezone
-from bs4 import BeautifulSoup
 import logging
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -18,28 +27,117 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 import warnings
 import urllib3
+from cache import TTLCache, SingleFlight
+from browser_pool import BrowserPool, BrowserPoolExhausted
+from resolver import DNSTimeoutError, Resolver, ResolvedHTTPAdapter, default_lookup
+from tls_probe import TLSProbe
+from html_scan import TagScanner, scan_html
+from probe_guard import ProbeGuard, ProbeRejected
+from metrics import PROBE_ERRORS, REGISTRY, STAGE_SECONDS
 
 # Suppress ALL SSL warnings
 warnings.filterwarnings('ignore', category=urllib3.exceptions.InsecureRequestWarning)
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Overall time budget (seconds) for extracting one URL's features
+FEATURE_DEADLINE = float(os.getenv("FEATURE_DEADLINE", "20"))
+FEATURE_WORKERS = int(os.getenv("FEATURE_WORKERS", "32"))
+
+# WHOIS results per registered domain; failures are cached for a shorter time
+WHOIS_CACHE_TTL = float(os.getenv("WHOIS_CACHE_TTL", "86400"))
+WHOIS_CACHE_NEGATIVE_TTL = float(os.getenv("WHOIS_CACHE_NEGATIVE_TTL", "600"))
+WHOIS_CACHE_SIZE = int(os.getenv("WHOIS_CACHE_SIZE", "10000"))
+
+# Shared keep-alive HTTP client for every outbound probe
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "100"))
+HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "1"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.3"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTML_TIMEOUT = float(os.getenv("HTML_TIMEOUT", "10"))
+# Pages are read and scanned up to this many (decompressed) bytes
+HTML_MAX_BYTES = int(os.getenv("HTML_MAX_BYTES", str(2 * 1024 * 1024)))
+HTML_MAX_TAGS = int(os.getenv("HTML_MAX_TAGS", "20000"))
+SSL_TIMEOUT = float(os.getenv("SSL_TIMEOUT", "3"))
+
+# Host resolution shared by dnsRecord and the HTTP/TLS probes
+DNS_TIMEOUT = float(os.getenv("DNS_TIMEOUT", "3"))
+DNS_CACHE_SIZE = int(os.getenv("DNS_CACHE_SIZE", "10000"))
+DNS_DEFAULT_TTL = float(os.getenv("DNS_DEFAULT_TTL", "300"))
+DNS_NEGATIVE_TTL = float(os.getenv("DNS_NEGATIVE_TTL", "60"))
+DNS_MAX_TTL = float(os.getenv("DNS_MAX_TTL", "3600"))
+
+# Certificate verdicts from SSLfinalState's TLS handshake probe
+TLS_CACHE_SIZE = int(os.getenv("TLS_CACHE_SIZE", "10000"))
+TLS_CACHE_MAX_TTL = float(os.getenv("TLS_CACHE_MAX_TTL", "3600"))
+TLS_INVALID_TTL = float(os.getenv("TLS_INVALID_TTL", "600"))
+TLS_ERROR_TTL = float(os.getenv("TLS_ERROR_TTL", "60"))
+
+# Headless browsers kept alive for the Selenium fallback
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_POOL_MAX_PAGES = int(os.getenv("BROWSER_POOL_MAX_PAGES", "50"))
+BROWSER_LEASE_TIMEOUT = float(os.getenv("BROWSER_LEASE_TIMEOUT", "10"))
+
+# Outbound probe limits. Each host (TLS and page probes), each name's DNS
+# lookups (at HOST_RATE) and each WHOIS server gets a token bucket of
+# *_RATE probes per second, bursting to *_BURST. After BREAKER_FAILURES
+# consecutive failures a target's circuit opens: its probes are skipped,
+# and the feature gets its fallback value, for BREAKER_RESET seconds
+# before one trial probe is let through.
+HOST_RATE = float(os.getenv("HOST_RATE", "10"))
+HOST_BURST = int(os.getenv("HOST_BURST", "20"))
+WHOIS_RATE = float(os.getenv("WHOIS_RATE", "5"))
+WHOIS_BURST = int(os.getenv("WHOIS_BURST", "10"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("BREAKER_RESET", "30"))
+
+# Memoized URL parsing and registered-domain lookups
+URL_CACHE_SIZE = int(os.getenv("URL_CACHE_SIZE", "4096"))
+DOMAIN_CACHE_SIZE = int(os.getenv("DOMAIN_CACHE_SIZE", "65536"))
+
+# Public suffix list from the snapshot bundled with tldextract: nothing is
+# downloaded at startup and no cache directory is written
+_tld = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+
+FEATURE_SECONDS = REGISTRY.histogram("feature_seconds", "Time to compute each feature", ("feature",))
+FEATURE_TIMEOUTS = REGISTRY.counter(
+    "feature_timeouts_total", "Features that missed the extraction deadline and got their default", ("feature",))
+
 def _normalize_url(url: str) -> str:
     url = (url or "").strip()
     if not re.match(r'^[a-zA-Z][a-zA-Z0-9+\-.]*://', url):
         url = "http://" + url
     return url
 
+@lru_cache(maxsize=URL_CACHE_SIZE)
 def _parsed(url: str):
     u = _normalize_url(url)
     p = urlparse(u)
-    ext = tldextract.extract(u)
+    ext = _tld(u)
     host = p.hostname or ""
-    reg_domain = ext.registered_domain or ""
+    reg_domain = (ext.registered_domain or "").lower()
     return u, p, ext, host, reg_domain
 
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def _host_domain(host: str) -> str:
+    return _tld(host).registered_domain
+
+# Scheme-relative or absolute link -> host, without a full urlparse
+_LINK_HOST = re.compile(r'^[^:/?#]*:?//(?:[^@/?#]*@)?(\[[^\]/?#]*\]|[^:/?#]*)')
+
+def _link_domain(link: str) -> str:
+    """Registered domain of an absolute link; "" for relative links.
+
+    Only the hostname is looked up, so every link to the same host after
+    the first is a cache hit.
+    """
+    m = _LINK_HOST.match(link)
+    if not m or not m.group(1):
+        return ""
+    return _host_domain(m.group(1).strip("[]").lower())
+
 def _is_ip_host(host: str) -> bool:
     if not host:
         return False
@@ -50,109 +148,359 @@ def _is_ip_host(host: str) -> bool:
     except Exception:
         return False
 
+_chromedriver_path = None
+
+def _start_chrome():
+    """Start one headless Chrome session for the browser pool"""
+    global _chromedriver_path
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--disable-images')
+    chrome_options.add_argument('--disable-javascript')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    chrome_options.page_load_strategy = 'eager'
+
+    # Resolve (and download if needed) the driver binary only once per process
+    if _chromedriver_path is None:
+        _chromedriver_path = ChromeDriverManager().install()
+    driver = webdriver.Chrome(service=Service(_chromedriver_path), options=chrome_options)
+    driver.set_page_load_timeout(8)
+    return driver
+
+browser_pool = BrowserPool(
+    _start_chrome,
+    size=BROWSER_POOL_SIZE,
+    max_pages=BROWSER_POOL_MAX_PAGES,
+    lease_timeout=BROWSER_LEASE_TIMEOUT,
+)
+atexit.register(browser_pool.close)
+
+def warm_browser_pool():
+    """Start the pooled browsers in the background so startup isn't blocked"""
+    threading.Thread(target=browser_pool.warm, name="browser-pool-warm", daemon=True).start()
+
 def _fetch_html_selenium(url: str):
-    """Fetch HTML using Selenium headless browser to bypass bot detection"""
-    driver = None
+    """Fetch HTML using a pooled headless browser to bypass bot detection"""
+    # ProbeRejected propagates: the caller imputes the page features
+    host_guard.acquire(_parsed(url)[3])
+    try:
+        driver = browser_pool.acquire()
+    except BrowserPoolExhausted as e:
+        logger.warning(f"Selenium: No browser available - {e}")
+        return None, None
+
+    discard = False
+    start = time.perf_counter()
     try:
         u = _normalize_url(url)
-        
-        # Setup Chrome options
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--disable-images')
-        chrome_options.add_argument('--disable-javascript')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.page_load_strategy = 'eager'
-        
-        # Initialize driver with webdriver-manager
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver.set_page_load_timeout(8)
-        
-        # Navigate to URL
         driver.get(u)
         
         # Get page source immediately
         page_source = driver.page_source
-        soup = BeautifulSoup(page_source, 'html.parser')
+        soup = scan_html(page_source[:HTML_MAX_BYTES], max_tags=HTML_MAX_TAGS)
         
-        logger.info(f"Selenium: Successfully fetched page")
+        logger.debug(f"Selenium: Successfully fetched page")
         return soup, None
         
     except TimeoutException:
         logger.warning(f"Selenium: Page load timeout - using partial content")
         try:
-            if driver:
-                page_source = driver.page_source
-                soup = BeautifulSoup(page_source, 'html.parser')
-                return soup, None
+            page_source = driver.page_source
+            soup = scan_html(page_source[:HTML_MAX_BYTES], max_tags=HTML_MAX_TAGS)
+            return soup, None
         except:
-            pass
+            discard = True
         return None, None
     except WebDriverException as e:
         logger.warning(f"Selenium: WebDriver error - {e}")
+        discard = True
         return None, None
     except Exception as e:
         logger.warning(f"Selenium: Failed to fetch - {e}")
+        discard = True
         return None, None
     finally:
-        if driver:
+        STAGE_SECONDS.labels("selenium").observe(time.perf_counter() - start)
+        if discard:
+            PROBE_ERRORS.labels("selenium").inc()
+        else:
             try:
-                driver.quit()
+                driver.delete_all_cookies()
             except:
-                pass
+                discard = True
+        browser_pool.release(driver, discard=discard)
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+def _timed_dns_lookup(host, timeout):
+    with STAGE_SECONDS.labels("dns").time():
+        try:
+            return default_lookup(host, timeout)
+        except socket.gaierror:
+            raise
+        except Exception:
+            PROBE_ERRORS.labels("dns").inc()
+            raise
+
+host_guard = ProbeGuard("host", rate=HOST_RATE, burst=HOST_BURST,
+                        failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET)
+# DNS answers are about the name's nameservers, not the host: a lookup that
+# times out must not trip the host's circuit
+dns_guard = ProbeGuard("dns", rate=HOST_RATE, burst=HOST_BURST,
+                       failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET)
+whois_guard = ProbeGuard("whois", rate=WHOIS_RATE, burst=WHOIS_BURST,
+                         failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET)
+
+resolver = Resolver(
+    lookup=_timed_dns_lookup,
+    timeout=DNS_TIMEOUT,
+    maxsize=DNS_CACHE_SIZE,
+    default_ttl=DNS_DEFAULT_TTL,
+    negative_ttl=DNS_NEGATIVE_TTL,
+    max_ttl=DNS_MAX_TTL,
+    guard=dns_guard,
+)
+
+def _build_http_session():
+    """Connection-pooled session with bounded per-host pools and retries.
+
+    Connections resolve hosts through the shared resolver, so the page fetch
+    and SSL check reuse the lookup dnsRecord (or an earlier check) made.
+    """
+    retry = Retry(
+        total=HTTP_RETRIES,
+        read=0,
+        backoff_factor=HTTP_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        raise_on_status=False,
+    )
+    adapter = ResolvedHTTPAdapter(
+        resolver,
+        pool_connections=HTTP_POOL_HOSTS,
+        pool_maxsize=HTTP_POOL_PER_HOST,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(BROWSER_HEADERS)
+    # Checks for different users must not share cookies
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+_http = _build_http_session()
+
+def _observe_handshake(seconds, info):
+    STAGE_SECONDS.labels("tls").observe(seconds)
+    if info.status == "error":
+        PROBE_ERRORS.labels("tls").inc()
+
+tls_probe = TLSProbe(
+    resolver,
+    timeout=SSL_TIMEOUT,
+    maxsize=TLS_CACHE_SIZE,
+    max_ttl=TLS_CACHE_MAX_TTL,
+    invalid_ttl=TLS_INVALID_TTL,
+    error_ttl=TLS_ERROR_TTL,
+    on_handshake=_observe_handshake,
+    guard=host_guard,
+)
+
+def _response_decoder(headers):
+    """Incremental decoder for the charset declared in Content-Type, UTF-8 otherwise"""
+    _, _, charset = headers.get("Content-Type", "").lower().partition("charset=")
+    encoding = charset.split(";")[0].strip(" \"'") or "utf-8"
+    try:
+        return codecs.getincrementaldecoder(encoding)(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+class BodyScanner:
+    """Feeds response body chunks to a TagScanner up to HTML_MAX_BYTES or HTML_TIMEOUT.
+
+    Shared by the blocking fetch and the asyncio one; feed() returns False
+    once the caller should stop reading.
+    """
+
+    def __init__(self, headers):
+        self._scanner = TagScanner(max_tags=HTML_MAX_TAGS)
+        self._decoder = _response_decoder(headers)
+        self._deadline = time.monotonic() + HTML_TIMEOUT
+        self.received = 0
+        self.parse_seconds = 0.0
+
+    def feed(self, chunk):
+        start = time.perf_counter()
+        self._scanner.feed(self._decoder.decode(chunk))
+        self.parse_seconds += time.perf_counter() - start
+        self.received += len(chunk)
+        if self.received >= HTML_MAX_BYTES or time.monotonic() > self._deadline:
+            logger.debug(f"HTML: stopped reading after {self.received} bytes")
+            self._scanner.page.truncated = True
+            return False
+        return True
+
+    def close(self):
+        start = time.perf_counter()
+        self._scanner.feed(self._decoder.decode(b"", final=True))
+        self._scanner.close()
+        STAGE_SECONDS.labels("html_parse").observe(self.parse_seconds + time.perf_counter() - start)
+        return self._scanner.page
+
+def _scan_response(r):
+    """Stream the body of a requests response into a ScannedPage"""
+    body = BodyScanner(r.headers)
+    for chunk in r.iter_content(chunk_size=64 * 1024):
+        if not body.feed(chunk):
+            break
+    return body.close()
+
+def _is_html(r):
+    content_type = r.headers.get("Content-Type", "").lower()
+    return not content_type or "html" in content_type or "xml" in content_type
+
+def _host_unreachable(e):
+    """Whether a failed request means the host didn't answer, as opposed to
+    its name not resolving (NXDOMAIN or a DNS timeout)"""
+    if not isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return False
+    reason = getattr(e.args[0], "reason", None) if e.args else None
+    return not isinstance(reason, (NameResolutionError, DNSTimeoutError))
 
 def _fetch_html(url: str):
     """Try requests first, fallback to Selenium if blocked"""
     try:
         u = _normalize_url(url)
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        }
-        r = requests.get(u, headers=headers, allow_redirects=True, timeout=10, verify=False)
-        logger.info(f"HTTP Status: {r.status_code}")
-        
-        if r.status_code == 200:
-            return BeautifulSoup(r.content, 'html.parser'), r
-        elif r.status_code == 403:
-            logger.warning(f"403 Forbidden - Trying Selenium...")
-            return _fetch_html_selenium(url)
-        else:
-            logger.warning(f"Non-200 status code: {r.status_code}")
-            return None, None
+        p = urlparse(u)
+        host_guard.acquire(p.hostname or "")
+        with STAGE_SECONDS.labels("html_fetch").time(), \
+                _http.get(u, allow_redirects=True, timeout=(HTTP_CONNECT_TIMEOUT, HTML_TIMEOUT),
+                          verify=False, stream=True) as r:
+            host_guard.success(p.hostname or "")
+            logger.debug(f"HTTP Status: {r.status_code}")
+
+            if r.status_code == 200:
+                if not _is_html(r):
+                    logger.warning(f"Not an HTML page: {r.headers.get('Content-Type')}")
+                    return None, None
+                return _scan_response(r), r
+            elif r.status_code != 403:
+                logger.warning(f"Non-200 status code: {r.status_code}")
+                return None, None
+        logger.warning(f"403 Forbidden - Trying Selenium...")
+        return _fetch_html_selenium(url)
+    except ProbeRejected:
+        raise
     except requests.exceptions.RequestException as e:
+        PROBE_ERRORS.labels("html").inc()
+        if _host_unreachable(e):
+            host_guard.failure(p.hostname or "")
         logger.warning(f"Request failed: {e} - Trying Selenium...")
         return _fetch_html_selenium(url)
     except Exception as e:
         logger.warning(f"Failed to fetch HTML: {e}")
         return None, None
 
-def _safe_whois(domain: str):
-    if not domain:
-        return None
+class PageContext:
+    """Per-URL analysis state: the page is fetched and scanned at most once"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._fetched = False
+        self._soup = None
+        self._response = None
+        self._rejected = None
+        self._lock = threading.Lock()
+
+    def fetch(self):
+        """(page, response); raises ProbeRejected if the host guard refused the fetch"""
+        with self._lock:
+            if not self._fetched:
+                try:
+                    self._soup, self._response = _fetch_html(self.url)
+                except ProbeRejected as e:
+                    self._rejected = e
+                self._fetched = True
+        if self._rejected is not None:
+            raise self._rejected
+        return self._soup, self._response
+
+    @classmethod
+    def loaded(cls, url: str, soup, response=None):
+        """Context for a page that was already fetched, e.g. by the asyncio probes"""
+        ctx = cls(url)
+        ctx._soup, ctx._response, ctx._fetched = soup, response, True
+        return ctx
+
+    @property
+    def soup(self):
+        return self.fetch()[0]
+
+def _page_soup(url: str, ctx=None):
+    """Scanned page for url, reusing ctx when it was built for the same URL"""
+    if ctx is None or ctx.url != url:
+        ctx = PageContext(url)
+    return ctx.soup
+
+_whois_cache = TTLCache(maxsize=WHOIS_CACHE_SIZE, ttl=WHOIS_CACHE_TTL)
+_whois_flight = SingleFlight()
+_NOT_CACHED = object()
+
+def _whois_server(domain: str) -> str:
+    """whois_guard key: lookups for one TLD all start at its registry's server"""
+    return domain.rsplit(".", 1)[-1]
+
+def _lookup_whois(domain: str):
+    server = _whois_server(domain)
+    # A rejection reaches every caller waiting on this lookup and isn't cached
+    whois_guard.acquire(server)
+    start = time.perf_counter()
     try:
-        return whois.whois(domain)
+        w = whois.whois(domain)
+        # Socket errors are swallowed by the client and parse to an empty entry
+        if not w or not any(w.values()):
+            raise OSError("no response from WHOIS server")
+        whois_guard.success(server)
     except Exception as e:
         logger.warning(f"WHOIS failed for {domain}: {e}")
+        PROBE_ERRORS.labels("whois").inc()
+        # "No match" and unparseable answers still mean the server responded
+        (whois_guard.failure if isinstance(e, OSError) else whois_guard.success)(server)
+        w = None
+    STAGE_SECONDS.labels("whois").observe(time.perf_counter() - start)
+    _whois_cache.set(domain, w, ttl=WHOIS_CACHE_TTL if w else WHOIS_CACHE_NEGATIVE_TTL)
+    return w
+
+def _safe_whois(domain: str):
+    """WHOIS record for a registered domain, or None; cached and deduplicated"""
+    if not domain:
         return None
+    domain = domain.lower()
+    w = _whois_cache.get(domain, _NOT_CACHED)
+    if w is not _NOT_CACHED:
+        return w
+    return _whois_flight.do(domain, _lookup_whois, domain)
 
 # Feature 1: IP Address
 def havingIP(url):
     try:
         _, _, _, host, _ = _parsed(url)
         result = 1 if _is_ip_host(host) else -1
-        logger.info(f"havingIP: {result}")
+        logger.debug(f"havingIP: {result}")
         return result
     except Exception as e:
         logger.error(f"havingIP error: {e}")
@@ -170,7 +518,7 @@ def havingSubDomain(url):
             dot_count = sub.count(".")
             result = 1 if dot_count >= 1 else 0
         
-        logger.info(f"havingSubDomain: {result} (subdomain: '{sub}')")
+        logger.debug(f"havingSubDomain: {result} (subdomain: '{sub}')")
         return result
     except Exception as e:
         logger.error(f"havingSubDomain error: {e}")
@@ -179,86 +527,94 @@ def havingSubDomain(url):
 # Feature 3: SSL State
 def SSLfinalState(url):
     try:
-        u, p, _, _, _ = _parsed(url)
+        _, p, _, host, _ = _parsed(url)
         
         if p.scheme != "https":
-            logger.info(f"SSLfinalState: 1 (no HTTPS)")
+            logger.debug(f"SSLfinalState: 1 (no HTTPS)")
             return 1
         
-        try:
-            requests.head(u, timeout=3, verify=True)
-            logger.info(f"SSLfinalState: -1 (valid SSL)")
-            return -1
-        except requests.exceptions.SSLError:
-            logger.info(f"SSLfinalState: 1 (SSL error)")
-            return 1
-        except Exception as e:
-            logger.warning(f"SSLfinalState: 0 (check failed: {e})")
-            return 0
+        return _ssl_verdict(tls_probe.check(host, p.port or 443))
+    except ProbeRejected:
+        raise
     except Exception as e:
         logger.error(f"SSLfinalState error: {e}")
         return 1
 
+def _ssl_verdict(cert):
+    if cert.status == "valid":
+        logger.debug(f"SSLfinalState: -1 (valid SSL, issuer: {cert.issuer}, expires: {cert.not_after})")
+        return -1
+    elif cert.status == "invalid":
+        logger.debug(f"SSLfinalState: 1 (SSL error: {cert.reason})")
+        return 1
+    else:
+        logger.warning(f"SSLfinalState: 0 (check failed: {cert.reason})")
+        return 0
+
 # Feature 4: Domain Registration Length
 def domainRegistrationLength(url):
     try:
         _, _, _, _, reg_domain = _parsed(url)
         if not reg_domain:
-            logger.info(f"domainRegistrationLength: 1 (no domain)")
+            logger.debug(f"domainRegistrationLength: 1 (no domain)")
             return 1
         
-        w = _safe_whois(reg_domain)
-        if not w:
-            logger.info(f"domainRegistrationLength: 1 (WHOIS failed)")
-            return 1
-        
-        creation = w.creation_date
-        expiration = w.expiration_date
-        
-        if isinstance(creation, list):
-            creation = min([d for d in creation if d], default=None)
-        if isinstance(expiration, list):
-            expiration = max([d for d in expiration if d], default=None)
-        
-        if not creation or not expiration:
-            logger.info(f"domainRegistrationLength: 1 (no dates)")
-            return 1
-        
-        # Make both timezone-aware
-        if creation.tzinfo is None:
-            creation = creation.replace(tzinfo=timezone.utc)
-        else:
-            creation = creation.astimezone(timezone.utc)
-            
-        if expiration.tzinfo is None:
-            expiration = expiration.replace(tzinfo=timezone.utc)
-        else:
-            expiration = expiration.astimezone(timezone.utc)
-        
-        days = (expiration - creation).days
-        result = 1 if days <= 365 else -1
-        logger.info(f"domainRegistrationLength: {result} ({days} days)")
-        return result
+        return _registration_verdict(_safe_whois(reg_domain))
+    except ProbeRejected:
+        raise
     except Exception as e:
         logger.error(f"domainRegistrationLength error: {e}")
         return 1
 
+def _registration_verdict(w):
+    if not w:
+        logger.debug(f"domainRegistrationLength: 1 (WHOIS failed)")
+        return 1
+    
+    creation = w.creation_date
+    expiration = w.expiration_date
+    
+    if isinstance(creation, list):
+        creation = min([d for d in creation if d], default=None)
+    if isinstance(expiration, list):
+        expiration = max([d for d in expiration if d], default=None)
+    
+    if not creation or not expiration:
+        logger.debug(f"domainRegistrationLength: 1 (no dates)")
+        return 1
+    
+    # Make both timezone-aware
+    if creation.tzinfo is None:
+        creation = creation.replace(tzinfo=timezone.utc)
+    else:
+        creation = creation.astimezone(timezone.utc)
+        
+    if expiration.tzinfo is None:
+        expiration = expiration.replace(tzinfo=timezone.utc)
+    else:
+        expiration = expiration.astimezone(timezone.utc)
+    
+    days = (expiration - creation).days
+    result = 1 if days <= 365 else -1
+    logger.debug(f"domainRegistrationLength: {result} ({days} days)")
+    return result
+
 # Feature 5: Request URL
-def requestURL(url):
+def requestURL(url, ctx=None):
     try:
-        soup, _ = _fetch_html(url)
+        soup = _page_soup(url, ctx)
         if not soup:
-            logger.info(f"requestURL: 1 (no HTML)")
+            logger.debug(f"requestURL: 1 (no HTML)")
             return 1
         
         _, _, _, _, reg_domain = _parsed(url)
         if not reg_domain:
-            logger.info(f"requestURL: 1 (no domain)")
+            logger.debug(f"requestURL: 1 (no domain)")
             return 1
         
         tags = soup.find_all(['img', 'video', 'audio', 'script', 'link'])
         if not tags:
-            logger.info(f"requestURL: -1 (no tags)")
+            logger.debug(f"requestURL: -1 (no tags)")
             return -1
         
         external = 0
@@ -269,14 +625,14 @@ def requestURL(url):
             if src and src.startswith('http'):
                 total += 1
                 try:
-                    src_domain = tldextract.extract(src).registered_domain
+                    src_domain = _link_domain(src)
                     if src_domain and src_domain != reg_domain:
                         external += 1
                 except:
                     pass
         
         if total == 0:
-            logger.info(f"requestURL: -1 (no external resources)")
+            logger.debug(f"requestURL: -1 (no external resources)")
             return -1
         
         pct = (external / total) * 100
@@ -288,28 +644,28 @@ def requestURL(url):
         else:
             result = 1
         
-        logger.info(f"requestURL: {result} ({pct:.1f}% external)")
+        logger.debug(f"requestURL: {result} ({pct:.1f}% external)")
         return result
     except Exception as e:
         logger.error(f"requestURL error: {e}")
         return 1
 
 # Feature 6: URL of Anchor
-def urlOfAnchor(url):
+def urlOfAnchor(url, ctx=None):
     try:
-        soup, _ = _fetch_html(url)
+        soup = _page_soup(url, ctx)
         if not soup:
-            logger.info(f"urlOfAnchor: 0 (no HTML)")
+            logger.debug(f"urlOfAnchor: 0 (no HTML)")
             return 0
         
         _, _, _, _, reg_domain = _parsed(url)
         if not reg_domain:
-            logger.info(f"urlOfAnchor: 0 (no domain)")
+            logger.debug(f"urlOfAnchor: 0 (no domain)")
             return 0
         
         anchors = soup.find_all('a', href=True)
         if not anchors:
-            logger.info(f"urlOfAnchor: -1 (no anchors)")
+            logger.debug(f"urlOfAnchor: -1 (no anchors)")
             return -1
         
         suspicious = 0
@@ -322,7 +678,7 @@ def urlOfAnchor(url):
                 suspicious += 1
             elif href.startswith('http'):
                 try:
-                    href_domain = tldextract.extract(href).registered_domain
+                    href_domain = _link_domain(href)
                     if href_domain and href_domain != reg_domain:
                         suspicious += 1
                 except:
@@ -337,28 +693,28 @@ def urlOfAnchor(url):
         else:
             result = 1
         
-        logger.info(f"urlOfAnchor: {result} ({pct:.1f}% suspicious)")
+        logger.debug(f"urlOfAnchor: {result} ({pct:.1f}% suspicious)")
         return result
     except Exception as e:
         logger.error(f"urlOfAnchor error: {e}")
         return 0
 
 # Feature 7: Links in Tags
-def linksInTags(url):
+def linksInTags(url, ctx=None):
     try:
-        soup, _ = _fetch_html(url)
+        soup = _page_soup(url, ctx)
         if not soup:
-            logger.info(f"linksInTags: 0 (no HTML)")
+            logger.debug(f"linksInTags: 0 (no HTML)")
             return 0
         
         _, _, _, _, reg_domain = _parsed(url)
         if not reg_domain:
-            logger.info(f"linksInTags: 0 (no domain)")
+            logger.debug(f"linksInTags: 0 (no domain)")
             return 0
         
         tags = soup.find_all(['meta', 'script', 'link'])
         if not tags:
-            logger.info(f"linksInTags: -1 (no tags)")
+            logger.debug(f"linksInTags: -1 (no tags)")
             return -1
         
         external = 0
@@ -370,14 +726,14 @@ def linksInTags(url):
                 if val and val.startswith('http'):
                     total += 1
                     try:
-                        val_domain = tldextract.extract(val).registered_domain
+                        val_domain = _link_domain(val)
                         if val_domain and val_domain != reg_domain:
                             external += 1
                     except:
                         pass
         
         if total == 0:
-            logger.info(f"linksInTags: -1 (no links)")
+            logger.debug(f"linksInTags: -1 (no links)")
             return -1
         
         pct = (external / total) * 100
@@ -389,23 +745,23 @@ def linksInTags(url):
         else:
             result = 1
         
-        logger.info(f"linksInTags: {result} ({pct:.1f}% external)")
+        logger.debug(f"linksInTags: {result} ({pct:.1f}% external)")
         return result
     except Exception as e:
         logger.error(f"linksInTags error: {e}")
         return 0
 
 # Feature 8: SFH (Server Form Handler)
-def sfh(url):
+def sfh(url, ctx=None):
     try:
-        soup, _ = _fetch_html(url)
+        soup = _page_soup(url, ctx)
         if not soup:
-            logger.info(f"SFH: -1 (no HTML)")
+            logger.debug(f"SFH: -1 (no HTML)")
             return -1
         
         forms = soup.find_all('form')
         if not forms:
-            logger.info(f"SFH: -1 (no forms)")
+            logger.debug(f"SFH: -1 (no forms)")
             return -1
         
         _, _, _, _, reg_domain = _parsed(url)
@@ -414,19 +770,19 @@ def sfh(url):
             action = form.get('action', '').strip()
             
             if not action or action in ['', 'about:blank']:
-                logger.info(f"SFH: 1 (empty/blank action)")
+                logger.debug(f"SFH: 1 (empty/blank action)")
                 return 1
             
             if action.startswith('http'):
                 try:
-                    action_domain = tldextract.extract(action).registered_domain
+                    action_domain = _link_domain(action)
                     if action_domain != reg_domain:
-                        logger.info(f"SFH: 1 (external form action)")
+                        logger.debug(f"SFH: 1 (external form action)")
                         return 1
                 except:
                     pass
         
-        logger.info(f"SFH: -1 (forms OK)")
+        logger.debug(f"SFH: -1 (forms OK)")
         return -1
     except Exception as e:
         logger.error(f"SFH error: {e}")
@@ -437,74 +793,277 @@ def ageOfDomain(url):
     try:
         _, _, _, _, reg_domain = _parsed(url)
         if not reg_domain:
-            logger.info(f"ageOfDomain: 1 (no domain)")
-            return 1
-        
-        w = _safe_whois(reg_domain)
-        if not w:
-            logger.info(f"ageOfDomain: 1 (WHOIS failed)")
+            logger.debug(f"ageOfDomain: 1 (no domain)")
             return 1
         
-        creation = w.creation_date
-        if isinstance(creation, list):
-            creation = min([d for d in creation if d], default=None)
-        
-        if not creation:
-            logger.info(f"ageOfDomain: 1 (no creation date)")
-            return 1
-        
-        # Make timezone-aware
-        if creation.tzinfo is None:
-            creation = creation.replace(tzinfo=timezone.utc)
-        else:
-            creation = creation.astimezone(timezone.utc)
-        
-        days = (datetime.now(timezone.utc) - creation).days
-        result = 1 if days <= 180 else -1
-        logger.info(f"ageOfDomain: {result} ({days} days old)")
-        return result
+        return _age_verdict(_safe_whois(reg_domain))
+    except ProbeRejected:
+        raise
     except Exception as e:
         logger.error(f"ageOfDomain error: {e}")
         return 1
 
+def _age_verdict(w):
+    if not w:
+        logger.debug(f"ageOfDomain: 1 (WHOIS failed)")
+        return 1
+    
+    creation = w.creation_date
+    if isinstance(creation, list):
+        creation = min([d for d in creation if d], default=None)
+    
+    if not creation:
+        logger.debug(f"ageOfDomain: 1 (no creation date)")
+        return 1
+    
+    # Make timezone-aware
+    if creation.tzinfo is None:
+        creation = creation.replace(tzinfo=timezone.utc)
+    else:
+        creation = creation.astimezone(timezone.utc)
+    
+    days = (datetime.now(timezone.utc) - creation).days
+    result = 1 if days <= 180 else -1
+    logger.debug(f"ageOfDomain: {result} ({days} days old)")
+    return result
+
 # Feature 10: DNS Record
 def dnsRecord(url):
     try:
         _, _, _, host, _ = _parsed(url)
         if not host:
-            logger.info(f"dnsRecord: 1 (no host)")
+            logger.debug(f"dnsRecord: 1 (no host)")
             return 1
         
         try:
-            socket.setdefaulttimeout(3)
-            socket.getaddrinfo(host, 80)
-            logger.info(f"dnsRecord: -1 (DNS OK)")
+            resolver.resolve(host)
+            logger.debug(f"dnsRecord: -1 (DNS OK)")
             return -1
         except socket.gaierror:
-            logger.info(f"dnsRecord: 1 (no DNS)")
+            logger.debug(f"dnsRecord: 1 (no DNS)")
             return 1
+        except ProbeRejected:
+            raise
         except Exception as e:
             logger.warning(f"dnsRecord: 0 (check failed: {e})")
             return 0
+    except ProbeRejected:
+        raise
     except Exception as e:
         logger.error(f"dnsRecord error: {e}")
         return -1
 
-def extract_features(url):
-    """Extract all 10 features with logging"""
-    logger.info(f"\n{'='*60}\nExtracting features for: {url}\n{'='*60}")
-    
-    features = []
-    features.append(havingIP(url))
-    features.append(havingSubDomain(url))
-    features.append(SSLfinalState(url))
-    features.append(domainRegistrationLength(url))
-    features.append(requestURL(url))
-    features.append(urlOfAnchor(url))
-    features.append(linksInTags(url))
-    features.append(sfh(url))
-    features.append(ageOfDomain(url))
-    features.append(dnsRecord(url))
-    
-    logger.info(f"{'='*60}\nFeature extraction complete\n{'='*60}\n")
-    return features
\ No newline at end of file
+# Lexical features: computed from the URL string alone, for the fast-path tier
+
+SHORTENERS = {
+    "bit.ly","goo.gl","t.co","tinyurl.com","ow.ly","is.gd","buff.ly","bit.do","lnkd.in","db.tt",
+    "qr.ae","adf.ly","cur.lv","tiny.cc","tr.im","su.pr","v.gd","soo.gd","shorte.st","x.co",
+    "cl.ly","s.id","rebrand.ly","cutt.ly","ulvis.net","short.io","1url.com"
+}
+
+def getLength(url):
+    try:
+        L = len(_normalize_url(url))
+        if L < 54:
+            return -1
+        elif L <= 75:
+            return 0
+        return 1
+    except Exception as e:
+        logger.error(f"getLength error: {e}")
+        return -1
+
+def tinyURL(url):
+    try:
+        _, _, _, _, reg_domain = _parsed(url)
+        return 1 if reg_domain.lower() in SHORTENERS else -1
+    except Exception as e:
+        logger.error(f"tinyURL error: {e}")
+        return 1
+
+def haveAtSign(url):
+    try:
+        return 1 if "@" in url else -1
+    except Exception as e:
+        logger.error(f"haveAtSign error: {e}")
+        return 1
+
+def redirection(url):
+    try:
+        u = _normalize_url(url)
+        i = u.find("://")
+        after = u[i+3:] if i != -1 else u
+        return 1 if "//" in after else -1
+    except Exception as e:
+        logger.error(f"redirection error: {e}")
+        return 1
+
+def prefixSuffix(url):
+    try:
+        _, _, ext, _, _ = _parsed(url)
+        return 1 if "-" in (ext.domain or "") else -1
+    except Exception as e:
+        logger.error(f"prefixSuffix error: {e}")
+        return -1
+
+def port(url):
+    try:
+        _, p, _, _, _ = _parsed(url)
+        if p.port is None:
+            return -1
+        return -1 if p.port in (80, 443) else 1
+    except Exception as e:
+        logger.error(f"port error: {e}")
+        return 1
+
+def httpDomain(url):
+    try:
+        _, _, _, host, _ = _parsed(url)
+        return 1 if "https" in host.lower() else -1
+    except Exception as e:
+        logger.error(f"httpDomain error: {e}")
+        return 1
+
+# (training column, extractor) for the lexical-only model, in its column order
+LEXICAL_FEATURES = [
+    ("having_IP_Address", havingIP),
+    ("URL_Length", getLength),
+    ("Shortining_Service", tinyURL),
+    ("having_At_Symbol", haveAtSign),
+    ("double_slash_redirecting", redirection),
+    ("Prefix_Suffix", prefixSuffix),
+    ("having_Sub_Domain", havingSubDomain),
+    ("port", port),
+    ("HTTPS_token", httpDomain),
+]
+
+def extract_lexical_features(url):
+    """Features of the lexical-only model; no network I/O"""
+    return [fn(url) for _, fn in LEXICAL_FEATURES]
+
+# (training column, extractor, fallback value, kind) in model column order.
+# The fallback is what the extractor itself returns when its check errors out;
+# it is also used when a probe misses the extraction deadline or its
+# ProbeGuard rejects it (the extractor raises ProbeRejected).
+# kind: "url" needs only the URL string, "net" does its own network probe,
+# "page" reads the shared PageContext.
+FEATURES = [
+    ("having_IP_Address", havingIP, 1, "url"),
+    ("having_Sub_Domain", havingSubDomain, 1, "url"),
+    ("SSLfinal_State", SSLfinalState, 1, "net"),
+    ("Domain_registeration_length", domainRegistrationLength, 1, "net"),
+    ("Request_URL", requestURL, 1, "page"),
+    ("URL_of_Anchor", urlOfAnchor, 0, "page"),
+    ("Links_in_tags", linksInTags, 0, "page"),
+    ("SFH", sfh, -1, "page"),
+    ("age_of_domain", ageOfDomain, 1, "net"),
+    ("DNSRecord", dnsRecord, -1, "net"),
+]
+
+FEATURE_DEFAULTS = {name: default for name, _, default, _ in FEATURES}
+
+_executor = ThreadPoolExecutor(max_workers=FEATURE_WORKERS, thread_name_prefix="feature")
+
+def _timed(name, fn, *args):
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        FEATURE_SECONDS.labels(name).observe(time.perf_counter() - start)
+
+# Stands in for the value of a feature whose probe was rejected
+_REJECTED = object()
+
+def _probe_group(url, ctx, indices):
+    """Values of the FEATURES at `indices`, computed in order on one worker"""
+    values = []
+    for i in indices:
+        name, fn, _, kind = FEATURES[i]
+        try:
+            if kind == "page":
+                # Page extractors swallow errors; a refused fetch has to surface here
+                ctx.fetch()
+            values.append(_timed(name, fn, *((url, ctx) if kind == "page" else (url,))))
+        except ProbeRejected as e:
+            logger.debug(f"{name}: skipped ({e})")
+            values.append(_REJECTED)
+    return values
+
+def _probe_groups():
+    # Each network probe runs on its own; the page features share one task
+    # so a URL holds a single worker for its fetch and the four scans
+    page = [i for i, (_, _, _, kind) in enumerate(FEATURES) if kind == "page"]
+    net = [[i] for i, (_, _, _, kind) in enumerate(FEATURES) if kind == "net"]
+    return net + ([page] if page else [])
+
+_PROBE_GROUPS = _probe_groups()
+
+def extract_features(url, timeout=None):
+    """Extract all 10 features, running network probes concurrently.
+
+    Probes still running after `timeout` seconds (FEATURE_DEADLINE by default)
+    are given their fallback value. Probes that haven't started by then are
+    cancelled; those already running finish in the background.
+    """
+    return extract_features_detailed(url, timeout)[0]
+
+def _start_extraction(url, timeout):
+    """Deadline in seconds for one extraction of url; with time to probe,
+    starts resolving its host, which DNS, TLS and page probes all wait on"""
+    logger.debug(f"\n{'='*60}\nExtracting features for: {url}\n{'='*60}")
+    deadline = FEATURE_DEADLINE if timeout is None else timeout
+    host = _parsed(url)[3]
+    if host and deadline > 0:
+        resolver.resolve_async(host)
+    return deadline
+
+def _finish_extraction(features, deadline, rejected, missed):
+    """Give the features whose probe was rejected or missed the deadline
+    their fallback value and return their names. With no time left no
+    probe was started, so every probed feature counts as missed."""
+    if deadline <= 0:
+        missed = [i for i, (_, _, _, kind) in enumerate(FEATURES) if kind != "url"]
+    for i in missed:
+        name, _, default, _ = FEATURES[i]
+        logger.warning(f"{name}: {default} (missed {deadline:.1f}s deadline)")
+        FEATURE_TIMEOUTS.labels(name).inc()
+    imputed = []
+    for i in sorted(list(rejected) + list(missed)):
+        name, _, default, _ = FEATURES[i]
+        features[i] = default
+        imputed.append(name)
+    logger.debug(f"{'='*60}\nFeature extraction complete\n{'='*60}\n")
+    return imputed
+
+def extract_features_detailed(url, timeout=None):
+    """extract_features() plus the names of the features that were given
+    their fallback value, because they missed the deadline or their probe
+    was rejected: (features, imputed)"""
+    start = time.monotonic()
+    deadline = _start_extraction(url, timeout)
+    # With no time left, start no probes: their results would be thrown away
+    groups = _PROBE_GROUPS if deadline > 0 else []
+
+    ctx = PageContext(url)
+    features = [None] * len(FEATURES)
+    pending = {_executor.submit(_probe_group, url, ctx, group): group for group in groups}
+
+    # URL-only features are cheap; compute them while the probes run
+    for i, (name, fn, _, kind) in enumerate(FEATURES):
+        if kind == "url":
+            features[i] = _timed(name, fn, url)
+
+    remaining = max(0.0, deadline - (time.monotonic() - start))
+    done, not_done = wait(pending, timeout=remaining)
+    rejected = []
+    for future in done:
+        for i, value in zip(pending[future], future.result()):
+            features[i] = value
+            if value is _REJECTED:
+                rejected.append(i)
+    missed = []
+    for future in not_done:
+        # Frees the worker for other URLs if the task hasn't started yet
+        future.cancel()
+        missed.extend(pending[future])
+    return features, _finish_extraction(features, deadline, rejected, missed)
@@ -0,0 +1,53 @@
+"""Production serving for the phishing detection API.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The model is loaded once in the master (preload_app) and shared
+copy-on-write with the forked workers. Each worker then connects to
+MongoDB and warms its own browser pool in post_fork, since neither a
+MongoClient nor running threads survive fork(). On SIGTERM workers stop
+accepting connections, finish in-flight checks within graceful_timeout,
+and flush queued url_checks writes before exiting.
+
+WEB_CONCURRENCY sets the number of worker processes (default: one per
+core) and GUNICORN_THREADS the request threads in each (default 8; most
+of a check is spent waiting on the network).
+"""
+import gc
+import os
+import multiprocessing
+
+# Read by app.py at import: defer per-process startup to post_fork
+os.environ["INIT_ON_IMPORT"] = "0"
+# One JSON record per line for log collectors; LOG_FORMAT=text overrides
+os.environ.setdefault("LOG_FORMAT", "json")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '7000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+preload_app = True
+
+# A check can take FEATURE_DEADLINE (20 s) plus scoring; leave headroom
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+# GUNICORN_ACCESS_LOG= (empty) turns the access log off
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+
+def when_ready(server):
+    # Keep the collector from touching (and so copying) the preloaded
+    # model's pages in every worker
+    gc.freeze()
+
+def post_fork(server, worker):
+    import app
+    app.init_worker()
+
+def worker_exit(server, worker):
+    import app
+    app.shutdown_worker()
@@ -0,0 +1,55 @@
+from html.parser import HTMLParser
+
+# Every tag the HTML features look at; everything else is skipped unbuilt
+SCANNED_TAGS = frozenset({"a", "img", "video", "audio", "script", "link", "meta", "form"})
+
+class ScannedPage:
+    """Attributes of the scanned tags, in document order.
+
+    find_all() mirrors the small part of BeautifulSoup's API the features
+    use: each tag is a dict of its attributes, so tag.get('src') and
+    tag['href'] work unchanged.
+    """
+
+    def __init__(self):
+        self.tags = []
+        self.truncated = False
+
+    def find_all(self, names, href=None):
+        if isinstance(names, str):
+            names = (names,)
+        found = [attrs for name, attrs in self.tags if name in names]
+        if href:
+            found = [attrs for attrs in found if "href" in attrs]
+        return found
+
+    def __bool__(self):
+        return True
+
+class TagScanner(HTMLParser):
+    """Incremental parser that records only the attributes of SCANNED_TAGS.
+
+    Feed it text as it arrives; no document tree is built. At most
+    `max_tags` tags are kept, so a hostile page can't grow the result
+    without bound.
+    """
+
+    def __init__(self, max_tags=20000):
+        super().__init__(convert_charrefs=True)
+        self.max_tags = max_tags
+        self.page = ScannedPage()
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in SCANNED_TAGS:
+            return
+        if len(self.page.tags) >= self.max_tags:
+            self.page.truncated = True
+            return
+        self.page.tags.append((tag, {name: value or "" for name, value in attrs}))
+
+def scan_html(text, max_tags=20000):
+    """ScannedPage for a complete HTML string"""
+    scanner = TagScanner(max_tags=max_tags)
+    scanner.feed(text)
+    scanner.close()
+    return scanner.page
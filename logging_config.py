@@ -0,0 +1,117 @@
+"""Process-wide logging: a non-blocking queue in front of one stderr handler.
+
+Request threads only put records on a bounded queue; a background
+listener thread formats and writes them. When the queue is full, records
+are dropped and counted rather than blocking a check.
+
+LOG_LEVEL sets the verbosity (default INFO; DEBUG adds the per-feature
+verdicts and the feature table of every check). LOG_FORMAT=json writes
+one JSON object per line, with any `fields` passed as
+extra={"fields": {...}} merged in; the default text format appends them
+as key=value pairs.
+"""
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    """levelname:logger:message followed by key=value for each field"""
+
+    def __init__(self):
+        super().__init__("%(levelname)s:%(name)s:%(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: records that don't fit are counted and dropped"""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_handler = None
+_listener = None
+_pid = None
+_settings = None
+
+def configure_logging(level=None, fmt=None, stream=None):
+    """Install the queue handler on the root logger and start its listener.
+
+    level and fmt default to LOG_LEVEL and LOG_FORMAT, read when called so
+    a .env loaded beforehand applies. A forked child (a gunicorn worker)
+    is given its own queue and listener thread automatically.
+    """
+    global _handler, _listener, _pid, _settings
+    if _listener is not None and _pid == os.getpid():
+        _listener.stop()
+
+    level = level or os.getenv("LOG_LEVEL", "INFO").upper()
+    fmt = fmt or os.getenv("LOG_FORMAT", "text")
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JSONFormatter() if fmt == "json" else TextFormatter())
+    _handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    _listener = QueueListener(_handler.queue, output)
+    _listener.start()
+    _pid = os.getpid()
+    _settings = (level, fmt, stream)
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(_handler)
+    root.setLevel(level)
+
+def _after_fork():
+    # The listener thread doesn't survive fork() and the queue's lock may
+    # have been held when it happened: start over with fresh ones
+    if _settings is not None:
+        configure_logging(*_settings)
+
+def flush_logging():
+    """Write out everything queued so far (the listener keeps running)"""
+    if _listener is not None and _pid == os.getpid():
+        _listener.stop()
+        _listener.start()
+
+def dropped_records():
+    return _handler.dropped if _handler is not None else 0
+
+def _stop():
+    if _listener is not None and _pid == os.getpid():
+        _listener.stop()
+
+atexit.register(_stop)
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,223 @@
+"""Counters, gauges and histograms rendered in the Prometheus text format.
+
+Metrics are registered once at import time on REGISTRY and updated from
+the request path; an update is a dict lookup plus a short lock. Values
+that components already track (cache hits, queue depth, pool usage) are
+read only when /metrics is scraped, through register_collector().
+
+Each process keeps its own numbers: under gunicorn every worker answers
+/metrics for itself.
+"""
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; covers a cache hit through a probe that runs into FEATURE_DEADLINE
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{_escape(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values):
+        """Child metric for one combination of label values"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.samples(self.name, self.labelnames, values))
+        return lines
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    @contextmanager
+    def track_inprogress(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def samples(self, name, labelnames, values):
+        return [f"{name}{_labels(labelnames, values)} {_number(self.value)}"]
+
+class Counter(_Metric):
+    kind = "counter"
+    _child = _Value
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+class Gauge(_Metric):
+    kind = "gauge"
+    _child = _Value
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def track_inprogress(self):
+        return self._default.track_inprogress()
+
+class _Buckets:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self, name, labelnames, values):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines, cumulative = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), counts):
+            cumulative += count
+            le = (("le", _number(float(bound))),)
+            lines.append(f"{name}_bucket{_labels(labelnames, values, le)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labelnames, values)} {_number(total)}")
+        lines.append(f"{name}_count{_labels(labelnames, values)} {cumulative}")
+        return lines
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def register_collector(self, collect):
+        """Call collect() at every scrape; it yields (name, kind, help, samples)
+        where samples is a list of (labels dict, value)"""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for collect in list(self._collectors):
+            for name, kind, help, samples in collect():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels, labels.values())} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Shared by features.py and the APIs: where a check spends its time
+STAGE_SECONDS = REGISTRY.histogram(
+    "stage_seconds", "Time spent in each stage of a check "
+    "(whois, dns, tls, html_fetch, html_parse, selenium, lexical, extract, score, db_flush)", ("stage",))
+PROBE_ERRORS = REGISTRY.counter(
+    "probe_errors_total", "Network probes that failed, by probe type", ("probe",))
+
+def cache_samples(caches):
+    """Collector output for named TTLCache-like objects with a stats() dict"""
+    stats = {name: cache.stats() for name, cache in caches.items() if cache is not None}
+    yield ("cache_hits_total", "counter", "Cache lookups that found a live entry",
+           [({"cache": n}, s["hits"]) for n, s in stats.items()])
+    yield ("cache_misses_total", "counter", "Cache lookups that found nothing",
+           [({"cache": n}, s["misses"]) for n, s in stats.items()])
+    yield ("cache_hit_ratio", "gauge", "Hits over lookups since start",
+           [({"cache": n}, s["hit_ratio"]) for n, s in stats.items()])
+    yield ("cache_entries", "gauge", "Entries currently cached",
+           [({"cache": n}, s["size"]) for n, s in stats.items()])
@@ -0,0 +1,118 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class ProbeRejected(Exception):
+    """The target is failing or over its rate limit; don't probe it now"""
+
+    def __init__(self, target, reason):
+        super().__init__(f"{reason}: {target}")
+        self.target = target
+        self.reason = reason
+
+class _Target:
+    __slots__ = ("tokens", "refilled", "failures", "state", "opened_at", "trial_at")
+
+    def __init__(self, burst, now):
+        self.tokens = burst
+        self.refilled = now
+        self.failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trial_at = None
+
+class ProbeGuard:
+    """Per-target token bucket and circuit breaker for outbound probes.
+
+    acquire(target) raises ProbeRejected when the target's bucket is empty
+    (`rate` probes per second, bursts of up to `burst`) or its circuit is
+    open. The circuit opens after `failure_threshold` consecutive
+    failure() reports and stays open for `reset_timeout` seconds; then a
+    single trial probe is let through (half-open). Its success() closes
+    the circuit, its failure() opens it again. State is kept for the
+    `maxsize` most recently used targets.
+    """
+
+    def __init__(self, name, rate=10.0, burst=20, failure_threshold=5, reset_timeout=30.0, maxsize=10000):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.maxsize = maxsize
+        self.rejected = {"circuit_open": 0, "rate_limited": 0}
+        self.opened = 0
+        self._targets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, target):
+        now = time.monotonic()
+        with self._lock:
+            t = self._target(target, now)
+            if t.state == OPEN:
+                if now - t.opened_at < self.reset_timeout:
+                    self._reject(target, "circuit_open")
+                t.state, t.trial_at = HALF_OPEN, None
+            # One trial at a time; a trial that never reported back is replaced
+            if t.state == HALF_OPEN and t.trial_at is not None and now - t.trial_at < self.reset_timeout:
+                self._reject(target, "circuit_open")
+
+            t.tokens = min(self.burst, t.tokens + (now - t.refilled) * self.rate)
+            t.refilled = now
+            if t.tokens < 1:
+                self._reject(target, "rate_limited")
+            t.tokens -= 1
+            if t.state == HALF_OPEN:
+                t.trial_at = now
+
+    def success(self, target):
+        with self._lock:
+            t = self._targets.get(target)
+            if t is not None:
+                if t.state != CLOSED:
+                    logger.info(f"{self.name}: circuit for {target} closed")
+                t.failures, t.state = 0, CLOSED
+
+    def failure(self, target):
+        now = time.monotonic()
+        with self._lock:
+            t = self._target(target, now)
+            t.failures += 1
+            if t.state == HALF_OPEN or (t.state == CLOSED and t.failures >= self.failure_threshold):
+                logger.warning(f"{self.name}: circuit for {target} opened after {t.failures} failures")
+                t.state, t.opened_at = OPEN, now
+                self.opened += 1
+
+    def state(self, target):
+        t = self._targets.get(target)
+        return t.state if t is not None else CLOSED
+
+    def stats(self):
+        with self._lock:
+            states = [t.state for t in self._targets.values()]
+        return {
+            "targets": len(states),
+            "open": states.count(OPEN),
+            "half_open": states.count(HALF_OPEN),
+            "opened": self.opened,
+            "rejected": dict(self.rejected),
+        }
+
+    def _target(self, target, now):
+        t = self._targets.get(target)
+        if t is None:
+            t = self._targets[target] = _Target(self.burst, now)
+            while len(self._targets) > self.maxsize:
+                self._targets.popitem(last=False)
+        else:
+            self._targets.move_to_end(target)
+        return t
+
+    def _reject(self, target, reason):
+        self.rejected[reason] += 1
+        raise ProbeRejected(target, reason)
@@ -0,0 +1,225 @@
+import time
+import socket
+import logging
+import ipaddress
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.connection import create_connection
+
+from cache import TTLCache
+
+try:
+    import dns.resolver
+    import dns.exception
+except ImportError:  # dnspython is optional; without it TTLs fall back to default_ttl
+    dns = None
+
+logger = logging.getLogger(__name__)
+
+def _literal_ip(host):
+    h = host[1:-1] if host.startswith('[') and host.endswith(']') else host
+    try:
+        return str(ipaddress.ip_address(h))
+    except ValueError:
+        return None
+
+# Cached in place of an address list for names that don't exist
+_NONEXISTENT = object()
+
+def _nx(host):
+    return socket.gaierror(socket.EAI_NONAME, f"Name or service not known: {host}")
+
+def system_lookup(host, timeout):
+    """(addresses, ttl) using the OS resolver; it reports no TTL"""
+    infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    return list(dict.fromkeys(info[4][0] for info in infos)), None
+
+def dnspython_lookup(host, timeout):
+    """(addresses, ttl) from DNS records, falling back to the OS for local names.
+
+    Fails like getaddrinfo() would: socket.gaierror for a name that doesn't
+    exist, and also for SERVFAIL from every nameserver (EAI_AGAIN).
+    """
+    for rdtype in ("A", "AAAA"):
+        try:
+            answer = dns.resolver.resolve(host, rdtype, lifetime=timeout)
+            return [r.to_text() for r in answer], answer.rrset.ttl
+        except dns.resolver.NoAnswer:
+            continue
+        except dns.resolver.NXDOMAIN:
+            break
+        except dns.resolver.NoNameservers as e:
+            raise socket.gaierror(socket.EAI_AGAIN, f"Temporary failure in name resolution: {host}") from e
+        except dns.exception.Timeout as e:
+            raise TimeoutError(f"DNS lookup for {host} timed out") from e
+    # Names like "localhost" or intranet hosts live in /etc/hosts, not DNS
+    if "." not in host.rstrip(".") or host.endswith(".localhost"):
+        return system_lookup(host, timeout)
+    raise _nx(host)
+
+def default_lookup(host, timeout):
+    """dnspython_lookup when dnspython is installed, else system_lookup"""
+    return (dnspython_lookup if dns is not None else system_lookup)(host, timeout)
+
+class Resolver:
+    """Host resolution with positive and negative caching and per-lookup timeouts.
+
+    Lookups run on a private thread pool, so a caller can start one early
+    with resolve_async() and wait for it later, and resolve() can give up
+    after `timeout` seconds without touching socket.setdefaulttimeout().
+    Concurrent requests for the same host share one lookup. Answers are
+    cached for their DNS TTL (capped at max_ttl; default_ttl when the
+    lookup reports none) and names that don't exist for negative_ttl.
+    With a ProbeGuard, each lookup that isn't cached first calls
+    guard.acquire(host) and then reports whether it got an answer; a
+    rejected lookup fails with ProbeRejected.
+    """
+
+    def __init__(self, lookup=None, timeout=3.0, workers=16, maxsize=10000,
+                 default_ttl=300, negative_ttl=60, max_ttl=3600, guard=None):
+        self.lookup = lookup or default_lookup
+        self.guard = guard
+        self.timeout = timeout
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.max_ttl = max_ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=default_ttl)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dns")
+
+    def resolve_async(self, host):
+        """Future for the host's address list; fails with socket.gaierror if it doesn't exist"""
+        host = (host or "").lower().rstrip(".")
+        ip = _literal_ip(host)
+        cached = [ip] if ip else self._cache.get(host)
+        if cached is not None:
+            future = Future()
+            if cached is _NONEXISTENT:
+                future.set_exception(_nx(host))
+            else:
+                future.set_result(cached)
+            return future
+
+        with self._lock:
+            future = self._inflight.get(host)
+            if future is None:
+                try:
+                    if self.guard is not None:
+                        self.guard.acquire(host)
+                except Exception as e:
+                    future = Future()
+                    future.set_exception(e)
+                    return future
+                future = self._inflight[host] = self._executor.submit(self._lookup, host)
+        return future
+
+    def resolve(self, host, timeout=None):
+        """Address list for host; raises socket.gaierror or TimeoutError"""
+        future = self.resolve_async(host)
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"DNS lookup for {host} timed out") from None
+
+    def cached(self, host):
+        """Cached address list for host, or None without doing a lookup"""
+        host = (host or "").lower().rstrip(".")
+        value = self._cache.get(host)
+        return None if value is _NONEXISTENT else value
+
+    def stats(self):
+        return self._cache.stats()
+
+    def _report(self, host, ok):
+        if self.guard is not None:
+            (self.guard.success if ok else self.guard.failure)(host)
+
+    def _lookup(self, host):
+        try:
+            addresses, ttl = self.lookup(host, self.timeout)
+            if not addresses:
+                raise _nx(host)
+            ttl = self.default_ttl if ttl is None else min(ttl, self.max_ttl)
+            self._cache.set(host, addresses, ttl=ttl)
+            self._report(host, True)
+            return addresses
+        except socket.gaierror as e:
+            # A name that doesn't exist is an answer, not a failing resolver;
+            # SERVFAIL (EAI_AGAIN) is cached alike but counts against the name
+            self._cache.set(host, _NONEXISTENT, ttl=self.negative_ttl)
+            self._report(host, e.errno != socket.EAI_AGAIN)
+            raise
+        except Exception:
+            self._report(host, False)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(host, None)
+
+class DNSTimeoutError(ConnectTimeoutError):
+    """Connect timeout spent waiting on the host's DNS lookup, not on the host"""
+
+class _ResolvedConnectionMixin:
+    """Connects to the addresses the shared Resolver found, keeping the hostname
+    for the Host header, SNI and certificate checks."""
+
+    resolver = None
+
+    def _new_conn(self):
+        try:
+            timeout = self.timeout if isinstance(self.timeout, (int, float)) else None
+            addresses = self.resolver.resolve(self.host, timeout=timeout)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        except TimeoutError as e:
+            raise DNSTimeoutError(self, f"DNS lookup for {self.host} timed out") from e
+
+        # Try each address in turn within the one connect timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        error = None
+        for address in addresses:
+            remaining = self.timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    error = socket.timeout("timed out")
+                    break
+            try:
+                return create_connection(
+                    (address, self.port),
+                    remaining,
+                    source_address=self.source_address,
+                    socket_options=self.socket_options,
+                )
+            except OSError as e:
+                error = e
+
+        if isinstance(error, socket.timeout):
+            raise ConnectTimeoutError(
+                self,
+                f"Connection to {self.host} timed out. (connect timeout={self.timeout})",
+            ) from error
+        raise NewConnectionError(self, f"Failed to establish a new connection: {error}") from error
+
+class ResolvedHTTPAdapter(HTTPAdapter):
+    """requests adapter whose connections resolve hosts through a Resolver"""
+
+    def __init__(self, resolver, **kwargs):
+        mixin = {"resolver": resolver}
+        http_conn = type("ResolvedHTTPConnection", (_ResolvedConnectionMixin, HTTPConnection), mixin)
+        https_conn = type("ResolvedHTTPSConnection", (_ResolvedConnectionMixin, HTTPSConnection), mixin)
+        self._pool_classes = {
+            "http": type("ResolvedHTTPConnectionPool", (HTTPConnectionPool,), {"ConnectionCls": http_conn}),
+            "https": type("ResolvedHTTPSConnectionPool", (HTTPSConnectionPool,), {"ConnectionCls": https_conn}),
+        }
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes
@@ -0,0 +1,92 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from features import _parsed
+
+GRANULARITIES = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+_COLLECTION_SUFFIX = {"hour": "hourly", "day": "daily"}
+
+# Registered domains become field names; Mongo reads dots in them as paths
+_DOT = "．"
+
+def bucket_start(ts, granularity):
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _domain_of(url):
+    try:
+        return _parsed(url)[4]
+    except Exception:
+        return ""
+
+class RollupStore:
+    """Hourly and daily pre-aggregated buckets of url_checks records.
+
+    Each bucket document is keyed by the start of its hour or day and holds
+    counts by prediction, counts per signal, and per-domain counts of checks
+    flagged as phishing. record() folds a batch of check records into the
+    buckets with one $inc upsert per bucket touched; timeseries() reads only the
+    buckets, never the raw checks.
+    """
+
+    def __init__(self, db, prefix="urlchecks"):
+        self.collections = {g: db[f"{prefix}_{_COLLECTION_SUFFIX[g]}"] for g in GRANULARITIES}
+
+    def record(self, docs):
+        for granularity, collection in self.collections.items():
+            incs = defaultdict(Counter)
+            for doc in docs:
+                ts = doc.get("checkedAt")
+                if ts is None:
+                    continue
+                inc = incs[bucket_start(ts, granularity)]
+                prediction = doc.get("prediction")
+                inc["total"] += 1
+                inc[f"predictions.{prediction}"] += 1
+                for signal in doc.get("signals") or []:
+                    inc[f"signals.{signal}"] += 1
+                if prediction == "phishing":
+                    domain = _domain_of(doc.get("url", ""))
+                    if domain:
+                        inc[f"domains.{domain.replace('.', _DOT)}"] += 1
+            # A batch spans one or two buckets, so this is one upsert per bucket
+            for start, inc in incs.items():
+                collection.update_one({"_id": start}, {"$inc": dict(inc)}, upsert=True)
+
+    def timeseries(self, granularity, periods, now, top=10):
+        """Per-bucket counts for the last `periods` buckets, plus top signals/domains"""
+        step = GRANULARITIES[granularity]
+        first = bucket_start(now, granularity) - step * (periods - 1)
+        found = {b["_id"]: b for b in self.collections[granularity].find({"_id": {"$gte": first}})}
+
+        series = []
+        signals = Counter()
+        domains = Counter()
+        for i in range(periods):
+            start = first + step * i
+            b = found.get(start, {})
+            predictions = b.get("predictions", {})
+            total = b.get("total", 0)
+            phishing = predictions.get("phishing", 0)
+            series.append({
+                "start": start.isoformat(),
+                "total_checks": total,
+                "phishing_detected": phishing,
+                "legitimate": predictions.get("legitimate", 0),
+                "phishing_rate": round(phishing / total * 100, 2) if total > 0 else 0
+            })
+            signals.update(b.get("signals", {}))
+            domains.update({d.replace(_DOT, "."): n for d, n in b.get("domains", {}).items()})
+
+        return {
+            "granularity": granularity,
+            "buckets": series,
+            "top_signals": [{"signal": s, "count": n} for s, n in signals.most_common(top)],
+            "top_flagged_domains": [{"domain": d, "count": n} for d, n in domains.most_common(top)],
+        }
+
@@ -0,0 +1,166 @@
+"""Score a large list of URLs offline, without going through the API.
+
+URLs are read one per line from a file or stdin (blank lines and lines
+starting with # are skipped), analyzed with
+features.extract_features_detailed on a worker pool, scored with the model
+artifact, and written as JSON lines or CSV as each chunk finishes. Rows
+list the features that fell back to their default (imputed) and are
+marked degraded when there are any. With --checkpoint, progress is
+recorded after every chunk and a rerun with the same arguments resumes
+where it stopped.
+
+Each URL in flight runs its network probes (five tasks: four probes and
+the page fetch) on the shared FEATURE_WORKERS thread pool, so --workers
+should be at most FEATURE_WORKERS / 5; beyond that probes queue, miss
+the --timeout deadline and are imputed.
+
+    python score_urls.py feed.txt -o scored.jsonl --checkpoint scored.ckpt
+    cat feed.txt | FEATURE_WORKERS=160 python score_urls.py - -o scored.csv --format csv --workers 32
+"""
+import os
+import sys
+import csv
+import json
+import argparse
+import warnings
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+
+from features import FEATURE_WORKERS, extract_features_detailed, _PROBE_GROUPS
+from logging_config import configure_logging
+from scoring import LookupTableScorer, Scorer, load_model, summarize
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score URLs from a file or stdin with the phishing model")
+    parser.add_argument("input", help="file with one URL per line, or - for stdin")
+    parser.add_argument("-o", "--output", required=True, help="file to write results to")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="output format (default: from the output file extension)")
+    parser.add_argument("--model", default=os.getenv("MODEL_PATH", "models/phishing_model_optimized.pkl"))
+    parser.add_argument("--scorer", choices=("model", "lut"), default=os.getenv("SCORER", "model"))
+    parser.add_argument("--workers", type=int, default=max(1, FEATURE_WORKERS // len(_PROBE_GROUPS)),
+                        help="URLs analyzed at once (default: as many as FEATURE_WORKERS probe threads serve)")
+    parser.add_argument("--chunk", type=int, default=500, help="URLs per checkpointed chunk")
+    parser.add_argument("--timeout", type=float, default=None, help="feature extraction deadline per URL in seconds")
+    parser.add_argument("--checkpoint", help="progress file; resume from it if it exists")
+    args = parser.parse_args(argv)
+    if args.format is None:
+        args.format = "csv" if args.output.endswith(".csv") else "jsonl"
+    return args
+
+def read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return {"lines": 0, "output_bytes": 0}
+    with open(path) as f:
+        return json.load(f)
+
+def write_checkpoint(path, lines, output_bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"lines": lines, "output_bytes": output_bytes}, f)
+    os.replace(tmp, path)
+
+class Writer:
+    """Appends scored rows as JSON lines or CSV"""
+
+    def __init__(self, f, fmt, feature_names, header):
+        self.f = f
+        self.fmt = fmt
+        self.feature_names = feature_names
+        if fmt == "csv":
+            self.csv = csv.writer(f)
+            if header:
+                self.csv.writerow(["url", "prediction", "confidence", "phishing_probability", "signals",
+                                   *feature_names, "imputed", "degraded", "error"])
+
+    def write(self, row):
+        if self.fmt == "jsonl":
+            self.f.write(json.dumps(row) + "\n")
+            return
+        features = row.get("features") or {}
+        self.csv.writerow([
+            row["url"], row.get("prediction", ""), row.get("confidence", ""),
+            row.get("phishingProbability", ""), ";".join(row.get("signals") or []),
+            *[features.get(name, "") for name in self.feature_names],
+            ";".join(row.get("imputed") or []), row.get("degraded", ""), row.get("error", ""),
+        ])
+
+def build_scorer(args):
+    model, feature_names, _, _ = load_model(args.model)
+    scorer = Scorer(model, feature_names)
+    if args.scorer == "lut":
+        scorer, live = LookupTableScorer.from_scorer(scorer), scorer
+        scorer.verify(live)
+    return scorer
+
+def score_chunk(scorer, executor, urls, timeout):
+    def extract(url):
+        try:
+            features_list, imputed = extract_features_detailed(url, timeout=timeout)
+        except Exception as e:
+            return None, None, str(e)
+        if len(features_list) != len(scorer.feature_names):
+            return None, None, f"Feature length mismatch: expected {len(scorer.feature_names)}, got {len(features_list)}"
+        return features_list, imputed, None
+
+    extracted = list(executor.map(extract, urls))
+    ok = [i for i, (features_list, _, _) in enumerate(extracted) if features_list is not None]
+    rows = [{"url": url, "error": err} for url, (_, _, err) in zip(urls, extracted)]
+    if ok:
+        predictions, probas = scorer.score([extracted[i][0] for i in ok])
+        for j, i in enumerate(ok):
+            features_list, imputed, _ = extracted[i]
+            verdict = summarize(scorer.classes, scorer.feature_names, features_list, predictions[j],
+                                probas[j] if probas is not None else None)
+            rows[i] = {"url": urls[i], **verdict, "imputed": imputed, "degraded": bool(imputed)}
+    return rows
+
+def main(argv=None):
+    args = parse_args(argv)
+    warnings.filterwarnings("ignore")
+    configure_logging()
+    if args.workers * len(_PROBE_GROUPS) > FEATURE_WORKERS:
+        print(f"Warning: {args.workers} workers need {args.workers * len(_PROBE_GROUPS)} probe threads, "
+              f"FEATURE_WORKERS is {FEATURE_WORKERS}; queued probes will miss the deadline and be imputed",
+              file=sys.stderr)
+    scorer = build_scorer(args)
+
+    state = read_checkpoint(args.checkpoint)
+    consumed = state["lines"]
+    resuming = consumed > 0 and os.path.exists(args.output)
+    if resuming:
+        # Drop anything written after the last checkpoint; it is redone below
+        with open(args.output, "r+b") as f:
+            f.truncate(state["output_bytes"])
+        print(f"Resuming after line {consumed}", file=sys.stderr)
+    else:
+        consumed = 0
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", errors="replace")
+    scored = 0
+    try:
+        with open(args.output, "a" if resuming else "w", newline="", encoding="utf-8") as out, \
+                ThreadPoolExecutor(max_workers=args.workers) as executor:
+            writer = Writer(out, args.format, scorer.feature_names, header=not resuming)
+            lines = iter(source)
+            for _ in islice(lines, consumed):
+                pass
+            while True:
+                chunk = list(islice(lines, args.chunk))
+                if not chunk:
+                    break
+                consumed += len(chunk)
+                urls = [line.strip() for line in chunk]
+                urls = [u for u in urls if u and not u.startswith("#")]
+                for row in score_chunk(scorer, executor, urls, args.timeout):
+                    writer.write(row)
+                scored += len(urls)
+                out.flush()
+                if args.checkpoint:
+                    write_checkpoint(args.checkpoint, consumed, out.tell())
+                print(f"{consumed} lines read, {scored} URLs scored", file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+if __name__ == "__main__":
+    main()
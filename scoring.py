@@ -0,0 +1,240 @@
+import os
+import threading
+
+import joblib
+import numpy as np
+
+DISCRIMINATIVE_FEATURES = [
+    "having_IP_Address",
+    "having_Sub_Domain",
+    "SSLfinal_State",
+    "Domain_registeration_length",
+    "Request_URL",
+    "URL_of_Anchor",
+    "Links_in_tags",
+    "SFH",
+    "age_of_domain",
+    "DNSRecord",
+]
+
+# Threads per predict_proba call. One row is scored faster without joblib
+# dispatch; concurrency comes from the web workers instead.
+SCORING_JOBS = int(os.getenv("SCORING_JOBS", "1"))
+
+def load_model(path):
+    artifact = joblib.load(path)
+
+    if isinstance(artifact, dict):
+        m = artifact.get("model")
+        features = artifact.get("features", DISCRIMINATIVE_FEATURES)
+        model_type = artifact.get("model_type", "Unknown")
+        accuracy = artifact.get("accuracy", None)
+        return m, features, model_type, accuracy
+    else:
+        return artifact, DISCRIMINATIVE_FEATURES, "Unknown", None
+
+def load_lexical_model(path):
+    """(model, features, tier info) of the artifact's lexical-only model, or None"""
+    artifact = joblib.load(path)
+    if not isinstance(artifact, dict) or artifact.get("lexical_model") is None:
+        return None
+    return artifact["lexical_model"], artifact["lexical_features"], artifact.get("tier") or {}
+
+def apply_overrides(feature_names, features_list, prediction):
+    """Rule-based override for obvious phishing patterns.
+
+    Returns the (possibly overridden) prediction and the reasons applied.
+    """
+    reasons = []
+    suspicious_count = sum(1 for f in features_list if f == 1)
+    
+    # Override 1: Very young domain (< 7 days) with multiple red flags
+    age_of_domain_idx = feature_names.index('age_of_domain') if 'age_of_domain' in feature_names else -1
+    if age_of_domain_idx != -1 and features_list[age_of_domain_idx] == 1 and suspicious_count >= 4:
+        prediction = 1
+        reasons.append("Very young domain with multiple suspicious features")
+    
+    # Override 2: 100% external resources with young domain
+    request_url_idx = feature_names.index('Request_URL') if 'Request_URL' in feature_names else -1
+    url_anchor_idx = feature_names.index('URL_of_Anchor') if 'URL_of_Anchor' in feature_names else -1
+    if (request_url_idx != -1 and features_list[request_url_idx] == 1 and
+        url_anchor_idx != -1 and features_list[url_anchor_idx] == 1 and
+        age_of_domain_idx != -1 and features_list[age_of_domain_idx] == 1):
+        prediction = 1
+        reasons.append("All external resources + suspicious anchors + young domain")
+    
+    return prediction, reasons
+
+def summarize(classes, feature_names, features_list, prediction, proba):
+    """Verdict fields shared by the API and the bulk scorer for one scored row"""
+    prediction, reasons = apply_overrides(feature_names, features_list, prediction)
+    result = "phishing" if prediction == 1 else "legitimate"
+
+    confidence = None
+    phishing_probability = None
+    
+    if proba is not None:
+        if classes:
+            try:
+                pred_idx = classes.index(prediction)
+                confidence = round(float(proba[pred_idx]) * 100, 2)
+            except ValueError:
+                confidence = round(float(max(proba)) * 100, 2)
+            
+            if 1 in classes:
+                phishing_probability = round(float(proba[classes.index(1)]) * 100, 2)
+        else:
+            confidence = round(float(max(proba)) * 100, 2)
+
+    signals = [feature_names[i] for i, v in enumerate(features_list) if v == 1]
+
+    return {
+        "prediction": result,
+        "confidence": confidence,
+        "phishingProbability": phishing_probability,
+        "signals": signals,
+        "features": dict(zip(feature_names, features_list)),
+        "overrides": reasons,
+    }
+
+class Scorer:
+    """Scores feature rows on plain NumPy arrays with a single predict_proba.
+
+    The artifact's feature order is checked against the columns the model was
+    fitted on once, here, so the per-request path needs no DataFrame and no
+    second forest traversal for predict(). The label is the most probable
+    class, which is what RandomForestClassifier.predict returns anyway.
+    """
+
+    def __init__(self, model, feature_names):
+        self.model = model
+        self.feature_names = list(feature_names)
+        self.classes = list(getattr(model, "classes_", []))
+        self.has_proba = hasattr(model, "predict_proba")
+        self._columns = self._column_order()
+        self._local = threading.local()
+        if hasattr(model, "n_jobs"):
+            model.n_jobs = SCORING_JOBS
+
+    def _column_order(self):
+        """Indices mapping artifact feature order to fitted order, or None"""
+        fitted = getattr(self.model, "feature_names_in_", None)
+        if fitted is None:
+            n = getattr(self.model, "n_features_in_", len(self.feature_names))
+            if n != len(self.feature_names):
+                raise ValueError(f"Model expects {n} features, artifact lists {len(self.feature_names)}")
+            return None
+        fitted = list(fitted)
+        if fitted == self.feature_names:
+            return None
+        missing = [name for name in fitted if name not in self.feature_names]
+        if missing:
+            raise ValueError(f"Model was fitted on features missing from the artifact: {missing}")
+        return np.array([self.feature_names.index(name) for name in fitted])
+
+    def _row_buffer(self):
+        buf = getattr(self._local, "row", None)
+        if buf is None:
+            buf = self._local.row = np.empty((1, len(self.feature_names)), dtype=np.float64)
+        return buf
+
+    def _predict(self, X):
+        if self._columns is not None:
+            X = X[:, self._columns]
+        if not self.has_proba:
+            return self.model.predict(X), None
+        probas = self.model.predict_proba(X)
+        predictions = np.asarray(self.classes)[probas.argmax(axis=1)] if self.classes else probas.argmax(axis=1)
+        return predictions, probas
+
+    def score_one(self, features_list):
+        """(prediction, class probabilities or None) for one feature row"""
+        buf = self._row_buffer()
+        buf[0, :] = features_list
+        predictions, probas = self._predict(buf)
+        return predictions[0], (probas[0] if probas is not None else None)
+
+    def score(self, rows):
+        """Predictions and class probabilities for many feature rows in one pass"""
+        X = np.asarray(rows, dtype=np.float64).reshape(len(rows), len(self.feature_names))
+        return self._predict(X)
+
+class LookupTableScorer:
+    """Scores by direct lookup in a table of the model's output for every input.
+
+    Every feature is -1, 0 or 1, so a model with n features has only 3**n
+    possible inputs (59,049 for ten). The table holds the class
+    probabilities for each of them, indexed by reading the row as a base-3
+    number, and is a drop-in replacement for Scorer that never calls sklearn.
+    """
+
+    def __init__(self, probas, classes, feature_names):
+        self.feature_names = list(feature_names)
+        self.classes = list(classes)
+        self.has_proba = True
+        self.probas = np.ascontiguousarray(probas, dtype=np.float64)
+        self.labels = np.asarray(classes)[self.probas.argmax(axis=1)]
+        n = len(self.feature_names)
+        if self.probas.shape[0] != 3 ** n:
+            raise ValueError(f"Lookup table has {self.probas.shape[0]} rows, expected {3 ** n}")
+        self._weights = 3 ** np.arange(n - 1, -1, -1)
+
+    @classmethod
+    def from_scorer(cls, scorer):
+        """Tabulate a live Scorer over the whole ternary input space"""
+        n = len(scorer.feature_names)
+        if not scorer.has_proba:
+            raise ValueError("Model has no predict_proba to tabulate")
+        grid = np.indices((3,) * n).reshape(n, -1).T - 1
+        _, probas = scorer.score(grid)
+        return cls(probas, scorer.classes, scorer.feature_names)
+
+    def verify(self, scorer, samples=2000, seed=0):
+        """Check the table against the live model on random feature rows"""
+        rng = np.random.default_rng(seed)
+        rows = rng.integers(-1, 2, size=(samples, len(self.feature_names)))
+        expected_labels, expected = scorer.score(rows)
+        labels, probas = self.score(rows)
+        if not (np.array_equal(labels, expected_labels) and np.allclose(probas, expected, rtol=0, atol=1e-12)):
+            worst = float(np.abs(probas - expected).max())
+            raise ValueError(f"Lookup table disagrees with the live model (max error {worst:.3g})")
+        return samples
+
+    def _index(self, X):
+        X = np.asarray(X)
+        if X.size and (X.min() < -1 or X.max() > 1):
+            raise ValueError("Feature values must be -1, 0 or 1")
+        return (X.astype(np.int64) + 1) @ self._weights
+
+    def score_one(self, features_list):
+        """(prediction, class probabilities) for one feature row"""
+        i = 0
+        for v in features_list:
+            if v not in (-1, 0, 1):
+                raise ValueError(f"Feature value {v!r} is not -1, 0 or 1")
+            i = i * 3 + int(v) + 1
+        return self.labels[i], self.probas[i]
+
+    def score(self, rows):
+        """Predictions and class probabilities for many feature rows"""
+        idx = self._index(np.asarray(rows).reshape(len(rows), len(self.feature_names)))
+        return self.labels[idx], self.probas[idx]
+
+    def save(self, path, **meta):
+        # Through a file object: given a name, np.savez would append .npz to it
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                probas=self.probas,
+                classes=np.asarray(self.classes),
+                features=np.asarray(self.feature_names),
+                **{k: np.asarray("" if v is None else v) for k, v in meta.items()},
+            )
+
+    @classmethod
+    def load(cls, path):
+        """(table, metadata dict) from a file written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            table = cls(data["probas"], data["classes"].tolist(), data["features"].tolist())
+            meta = {k: data[k].item() for k in data.files if k not in ("probas", "classes", "features")}
+        return table, meta
@@ -0,0 +1,84 @@
+import math
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+import features
+
+@pytest.fixture(scope="module")
+def api(tmp_path_factory):
+    """app imported against a small stand-in for the trained artifact"""
+    names = [name for name, _, _, _ in features.FEATURES]
+    rng = np.random.default_rng(0)
+    X = rng.integers(-1, 2, size=(200, len(names)))
+    y = np.where(X.sum(axis=1) > 0, 1, -1)
+    path = tmp_path_factory.mktemp("model") / "model.pkl"
+    joblib.dump({"model": DecisionTreeClassifier(max_depth=3).fit(X, y), "features": names,
+                 "model_type": "DecisionTree", "accuracy": 1.0}, path)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("MODEL_PATH", str(path))
+        mp.setenv("SCORER", "model")
+        mp.setenv("TIERED", "0")
+        mp.delenv("MONGODB_URI", raising=False)
+        import app
+        yield app
+
+@pytest.mark.parametrize("value", [True, False, math.nan, math.inf, -math.inf, 0, -5, "100", None])
+def test_request_budget_rejects_bad_timeouts(api, value):
+    with pytest.raises(ValueError):
+        api._request_budget({"timeout_ms": value})
+
+def test_request_budget_is_capped_at_the_feature_deadline(api):
+    assert api._request_budget({"timeout_ms": 250}) == pytest.approx(min(0.25, api.FEATURE_DEADLINE))
+    assert api._request_budget({"timeout_ms": 10 ** 9}) == api.FEATURE_DEADLINE
+    assert api._request_budget({}) == min(api.REQUEST_TIMEOUT_MS / 1000, api.FEATURE_DEADLINE)
+
+@pytest.fixture
+def client(api):
+    api.result_cache.clear()
+    return api.app.test_client()
+
+def stub_extraction(api, monkeypatch, imputed):
+    n = len(api.FEATURE_NAMES)
+    monkeypatch.setattr(api, "extract_features_detailed", lambda url, timeout: ([1] * n, list(imputed)))
+
+def test_degraded_result_is_not_cached(api, client, monkeypatch):
+    stub_extraction(api, monkeypatch, ["SFH"])
+    body = client.post("/predict", json={"url": "http://example.test/"}).get_json()
+    assert body["degraded"] is True and body["imputed"] == ["SFH"]
+    assert api.result_cache.get(api._cache_key("http://example.test/")) is None
+
+    stub_extraction(api, monkeypatch, [])
+    body = client.post("/predict", json={"url": "http://example.test/"}).get_json()
+    assert body["degraded"] is False
+    assert api.result_cache.get(api._cache_key("http://example.test/")) is not None
+    assert client.post("/predict", json={"url": "http://example.test/"}).get_json()["cached"] is True
+
+def test_degraded_batch_results_are_not_cached(api, client, monkeypatch):
+    stub_extraction(api, monkeypatch, ["DNSRecord"])
+    body = client.post("/predict/batch", json={"urls": ["http://a.test/", "http://b.test/"]}).get_json()
+    assert body["succeeded"] == 2
+    assert all(item["degraded"] for item in body["results"])
+    assert api.result_cache.get(api._cache_key("http://a.test/")) is None
+
+def test_feature_length_mismatch_reports_expected_and_got(api, client, monkeypatch):
+    monkeypatch.setattr(api, "extract_features_detailed", lambda url, timeout: ([1, 1], []))
+    response = client.post("/predict", json={"url": "http://example.test/"})
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "Feature length mismatch", "expected": len(api.FEATURE_NAMES), "got": 2}
+
+def test_lexical_result_has_the_full_result_keys(api, monkeypatch):
+    class Confident:
+        classes = [-1, 1]
+        feature_names = [name for name, _ in features.LEXICAL_FEATURES]
+
+        def score_one(self, row):
+            return -1, np.array([0.95, 0.05])
+
+    monkeypatch.setattr(api, "lexical_scorer", Confident())
+    monkeypatch.setattr(api, "TIER_BAND", (0.2, 0.8))
+    result = api._lexical_result("http://example.test/", "anonymous")
+    assert result["tier"] == "lexical"
+    assert result["imputed"] == [] and result["degraded"] is False
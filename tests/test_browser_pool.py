@@ -0,0 +1,147 @@
+import time
+import threading
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+import features
+from browser_pool import BrowserPool, BrowserPoolExhausted
+
+class StubDriver:
+    def __init__(self, n, page="<html><body><a href='/x'>x</a></body></html>", error=None):
+        self.n = n
+        self.page = page
+        self.error = error
+        self.quit_called = False
+        self.pages = 0
+
+    def get(self, url):
+        self.pages += 1
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def page_source(self):
+        return self.page
+
+    def delete_all_cookies(self):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+class StubFactory:
+    def __init__(self, **driver_kwargs):
+        self.driver_kwargs = driver_kwargs
+        self.drivers = []
+
+    def __call__(self):
+        driver = StubDriver(len(self.drivers), **self.driver_kwargs)
+        self.drivers.append(driver)
+        return driver
+
+def test_sessions_are_created_on_demand_and_reused():
+    factory = StubFactory()
+    pool = BrowserPool(factory, size=2)
+    driver = pool.acquire()
+    pool.release(driver)
+    assert pool.acquire() is driver
+    assert len(factory.drivers) == 1
+
+def test_lease_times_out_when_every_session_is_busy():
+    pool = BrowserPool(StubFactory(), size=1, lease_timeout=0.1)
+    pool.acquire()
+    start = time.perf_counter()
+    with pytest.raises(BrowserPoolExhausted):
+        pool.acquire()
+    assert 0.1 <= time.perf_counter() - start < 1
+    assert pool.stats()["waiting"] == 0
+
+def test_waiter_gets_the_released_session():
+    pool = BrowserPool(StubFactory(), size=1, lease_timeout=3)
+    driver = pool.acquire()
+    threading.Timer(0.1, pool.release, (driver,)).start()
+    assert pool.acquire() is driver
+
+def test_session_is_recycled_after_max_pages():
+    factory = StubFactory()
+    pool = BrowserPool(factory, size=1, max_pages=3)
+    for _ in range(3):
+        driver = pool.acquire()
+        pool.release(driver)
+    first = factory.drivers[0]
+    assert first.quit_called
+    assert pool.stats()["created"] == 0
+    assert pool.acquire() is not first
+    assert len(factory.drivers) == 2
+
+def test_discarded_session_is_replaced():
+    factory = StubFactory()
+    pool = BrowserPool(factory, size=1)
+    crashed = pool.acquire()
+    pool.release(crashed, discard=True)
+    assert crashed.quit_called
+    assert pool.stats() == {"size": 1, "created": 0, "idle": 0, "busy": 0, "waiting": 0}
+    assert pool.acquire() is not crashed
+
+def test_discard_frees_a_slot_for_a_waiter():
+    pool = BrowserPool(StubFactory(), size=1, lease_timeout=3)
+    crashed = pool.acquire()
+    threading.Timer(0.1, pool.release, (crashed,), {"discard": True}).start()
+    replacement = pool.acquire()
+    assert replacement is not crashed
+
+def test_failed_start_gives_the_slot_back():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("chrome not found")
+        return StubDriver(len(calls))
+
+    pool = BrowserPool(factory, size=1)
+    with pytest.raises(BrowserPoolExhausted):
+        pool.acquire()
+    assert pool.stats()["created"] == 0
+    assert pool.acquire() is not None
+
+def test_warm_starts_sessions_up_front():
+    factory = StubFactory()
+    pool = BrowserPool(factory, size=3)
+    assert pool.warm(2) == 2
+    assert pool.stats()["idle"] == 2
+    assert pool.warm() == 1
+    assert len(factory.drivers) == 3
+
+def test_close_quits_idle_sessions_and_fails_waiters():
+    factory = StubFactory()
+    pool = BrowserPool(factory, size=1)
+    busy = pool.acquire()
+    pool.close()
+    with pytest.raises(BrowserPoolExhausted):
+        pool.acquire()
+    pool.release(busy)
+    assert busy.quit_called
+
+@pytest.fixture
+def stub_pool(monkeypatch):
+    def install(**driver_kwargs):
+        factory = StubFactory(**driver_kwargs)
+        pool = BrowserPool(factory, size=1)
+        monkeypatch.setattr(features, "browser_pool", pool)
+        return pool, factory
+    return install
+
+def test_selenium_fetch_returns_the_session_to_the_pool(stub_pool):
+    pool, factory = stub_pool()
+    page, response = features._fetch_html_selenium("http://192.0.2.10/login")
+    assert page is not None and response is None
+    assert pool.stats()["idle"] == 1
+    assert not factory.drivers[0].quit_called
+
+def test_selenium_fetch_discards_a_crashed_session(stub_pool):
+    pool, factory = stub_pool(error=WebDriverException("chrome not reachable"))
+    assert features._fetch_html_selenium("http://192.0.2.10/login") == (None, None)
+    assert factory.drivers[0].quit_called
+    assert pool.stats()["created"] == 0
@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+import features
+from probe_guard import ProbeRejected
+
+class StubResolver:
+    def __init__(self):
+        self.hosts = []
+
+    def resolve_async(self, host):
+        self.hosts.append(host)
+
+class Probes:
+    """Stub feature functions that record which of them ran"""
+
+    def __init__(self):
+        self.calls = []
+
+    def net(self, name, value=-1, delay=0.0):
+        def probe(url):
+            self.calls.append(name)
+            time.sleep(delay)
+            return value
+        return probe
+
+    def page(self, name, value=-1):
+        def probe(url, ctx):
+            self.calls.append(name)
+            return value
+        return probe
+
+@pytest.fixture
+def stubbed(monkeypatch):
+    """Installs FEATURES built from (name, kind, default, fn) and returns the stub resolver"""
+    resolver = StubResolver()
+    monkeypatch.setattr(features, "resolver", resolver)
+    monkeypatch.setattr(features, "_fetch_html", lambda url: (None, None))
+
+    def install(*specs):
+        monkeypatch.setattr(features, "FEATURES", [(name, fn, default, kind) for name, kind, default, fn in specs])
+        monkeypatch.setattr(features, "_PROBE_GROUPS", features._probe_groups())
+        return resolver
+    return install
+
+def page_features(probes):
+    return [(name, "page", default, probes.page(name)) for name, default in
+            [("Request_URL", 1), ("URL_of_Anchor", 0), ("Links_in_tags", 0), ("SFH", -1)]]
+
+URL = "http://example.test/login"
+
+def test_probes_that_miss_the_deadline_get_their_default(stubbed):
+    probes = Probes()
+    stubbed(
+        ("lexical", "url", 1, lambda url: -1),
+        ("fast", "net", 1, probes.net("fast")),
+        ("slow", "net", 1, probes.net("slow", delay=1.0)),
+    )
+    start = time.monotonic()
+    values, imputed = features.extract_features_detailed(URL, timeout=0.2)
+    assert time.monotonic() - start < 0.8
+    assert values == [-1, -1, 1]
+    assert imputed == ["slow"]
+
+def test_no_time_left_starts_no_probes(stubbed):
+    probes = Probes()
+    resolver = stubbed(
+        ("lexical", "url", 1, lambda url: -1),
+        ("fast", "net", 1, probes.net("fast")),
+        *page_features(probes),
+    )
+    values, imputed = features.extract_features_detailed(URL, timeout=0)
+    assert probes.calls == []
+    assert resolver.hosts == []
+    assert values == [-1, 1, 1, 0, 0, -1]
+    assert imputed == ["fast", "Request_URL", "URL_of_Anchor", "Links_in_tags", "SFH"]
+
+def test_rejected_page_fetch_imputes_every_page_feature(stubbed, monkeypatch):
+    def refused(url):
+        raise ProbeRejected("example.test", "circuit_open")
+    probes = Probes()
+    stubbed(("fast", "net", 1, probes.net("fast")), *page_features(probes))
+    monkeypatch.setattr(features, "_fetch_html", refused)
+    values, imputed = features.extract_features_detailed(URL, timeout=2)
+    assert values == [-1, 1, 0, 0, -1]
+    assert imputed == ["Request_URL", "URL_of_Anchor", "Links_in_tags", "SFH"]
+    assert probes.calls == ["fast"]
+
+def test_complete_extraction_imputes_nothing(stubbed):
+    probes = Probes()
+    resolver = stubbed(("fast", "net", 1, probes.net("fast")), *page_features(probes))
+    values, imputed = features.extract_features_detailed(URL, timeout=2)
+    assert values == [-1] * 5
+    assert imputed == []
+    assert resolver.hosts == ["example.test"]
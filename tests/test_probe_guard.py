@@ -0,0 +1,140 @@
+import pytest
+
+import probe_guard
+from probe_guard import ProbeGuard, ProbeRejected
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(probe_guard.time, "monotonic", clock)
+    return clock
+
+def guard(**kwargs):
+    options = dict(rate=1000, burst=1000, failure_threshold=3, reset_timeout=30)
+    options.update(kwargs)
+    return ProbeGuard("test", **options)
+
+def rejected(g, target="example.test"):
+    with pytest.raises(ProbeRejected) as e:
+        g.acquire(target)
+    return e.value.reason
+
+def open_circuit(g, target="example.test"):
+    for _ in range(g.failure_threshold):
+        g.acquire(target)
+        g.failure(target)
+    assert g.state(target) == "open"
+
+def test_circuit_opens_after_consecutive_failures(clock):
+    g = guard()
+    for _ in range(2):
+        g.acquire("example.test")
+        g.failure("example.test")
+    assert g.state("example.test") == "closed"
+    g.failure("example.test")
+    assert g.state("example.test") == "open"
+    assert g.stats()["opened"] == 1
+
+def test_success_resets_the_failure_count(clock):
+    g = guard()
+    g.failure("example.test")
+    g.failure("example.test")
+    g.success("example.test")
+    g.failure("example.test")
+    g.failure("example.test")
+    assert g.state("example.test") == "closed"
+
+def test_open_circuit_rejects_until_reset_timeout(clock):
+    g = guard()
+    open_circuit(g)
+    clock.advance(29.9)
+    assert rejected(g) == "circuit_open"
+    assert g.stats()["rejected"]["circuit_open"] == 1
+    # Other targets are unaffected
+    g.acquire("other.test")
+
+def test_half_open_lets_a_single_trial_through(clock):
+    g = guard()
+    open_circuit(g)
+    clock.advance(30)
+    g.acquire("example.test")
+    assert g.state("example.test") == "half_open"
+    assert rejected(g) == "circuit_open"
+
+def test_trial_that_never_reports_is_replaced(clock):
+    g = guard()
+    open_circuit(g)
+    clock.advance(30)
+    g.acquire("example.test")
+    clock.advance(29.9)
+    assert rejected(g) == "circuit_open"
+    clock.advance(0.1)
+    g.acquire("example.test")
+    assert g.state("example.test") == "half_open"
+
+def test_successful_trial_closes_the_circuit(clock):
+    g = guard()
+    open_circuit(g)
+    clock.advance(30)
+    g.acquire("example.test")
+    g.success("example.test")
+    assert g.state("example.test") == "closed"
+    g.acquire("example.test")
+    g.acquire("example.test")
+
+def test_failed_trial_opens_the_circuit_again(clock):
+    g = guard()
+    open_circuit(g)
+    clock.advance(30)
+    g.acquire("example.test")
+    # One failure is enough from half-open, whatever the threshold
+    g.failure("example.test")
+    assert g.state("example.test") == "open"
+    assert g.stats()["opened"] == 2
+    clock.advance(29.9)
+    assert rejected(g) == "circuit_open"
+    clock.advance(0.1)
+    g.acquire("example.test")
+
+def test_bucket_empties_and_refills_at_rate(clock):
+    g = guard(rate=2, burst=3)
+    for _ in range(3):
+        g.acquire("example.test")
+    assert rejected(g) == "rate_limited"
+    clock.advance(0.5)
+    g.acquire("example.test")
+    assert rejected(g) == "rate_limited"
+    # Refill stops at the burst size
+    clock.advance(60)
+    for _ in range(3):
+        g.acquire("example.test")
+    assert rejected(g) == "rate_limited"
+    assert g.stats()["rejected"]["rate_limited"] == 3
+
+def test_buckets_are_per_target(clock):
+    g = guard(rate=1, burst=1)
+    g.acquire("a.test")
+    assert rejected(g, "a.test") == "rate_limited"
+    g.acquire("b.test")
+
+def test_least_recently_used_target_is_evicted(clock):
+    g = guard(maxsize=2)
+    open_circuit(g, "a.test")
+    open_circuit(g, "b.test")
+    # Touching a.test makes b.test the oldest
+    assert rejected(g, "a.test") == "circuit_open"
+    g.acquire("c.test")
+    assert g.stats()["targets"] == 2
+    assert g.state("a.test") == "open"
+    assert g.state("b.test") == "closed"
+    g.acquire("b.test")
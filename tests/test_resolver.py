@@ -0,0 +1,221 @@
+import time
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import dns.resolver
+import pytest
+import requests
+from urllib3.exceptions import NameResolutionError, NewConnectionError
+
+import resolver as resolver_module
+from probe_guard import ProbeGuard, ProbeRejected
+from resolver import DNSTimeoutError, ResolvedHTTPAdapter, Resolver, dnspython_lookup
+
+class StubLookup:
+    """lookup(host, timeout) returning canned answers and counting calls"""
+
+    def __init__(self, answer=(["192.0.2.1"], 300), delay=0.0, gate=None):
+        self.answer = answer
+        self.delay = delay
+        self.gate = gate
+        self.calls = []
+
+    def __call__(self, host, timeout):
+        self.calls.append(host)
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.delay:
+            time.sleep(self.delay)
+        if isinstance(self.answer, BaseException):
+            raise self.answer
+        return self.answer
+
+def nx(host="missing.test"):
+    return socket.gaierror(socket.EAI_NONAME, f"Name or service not known: {host}")
+
+def test_answer_is_cached_for_its_ttl():
+    lookup = StubLookup((["192.0.2.1"], 0.2))
+    r = Resolver(lookup=lookup)
+    assert r.resolve("Example.TEST.") == ["192.0.2.1"]
+    assert r.resolve("example.test") == ["192.0.2.1"]
+    assert r.cached("example.test") == ["192.0.2.1"]
+    assert len(lookup.calls) == 1
+    time.sleep(0.25)
+    assert r.cached("example.test") is None
+    r.resolve("example.test")
+    assert len(lookup.calls) == 2
+
+def test_ttl_is_capped_at_max_ttl():
+    lookup = StubLookup((["192.0.2.1"], 86400))
+    r = Resolver(lookup=lookup, max_ttl=0.2)
+    r.resolve("example.test")
+    time.sleep(0.25)
+    r.resolve("example.test")
+    assert len(lookup.calls) == 2
+
+def test_missing_ttl_uses_default_ttl():
+    lookup = StubLookup((["192.0.2.1"], None))
+    r = Resolver(lookup=lookup, default_ttl=0.2)
+    r.resolve("example.test")
+    r.resolve("example.test")
+    time.sleep(0.25)
+    r.resolve("example.test")
+    assert len(lookup.calls) == 2
+
+def test_nonexistent_name_is_cached_for_negative_ttl():
+    lookup = StubLookup(nx())
+    r = Resolver(lookup=lookup, negative_ttl=0.2)
+    for _ in range(3):
+        with pytest.raises(socket.gaierror):
+            r.resolve("missing.test")
+    assert len(lookup.calls) == 1
+    assert r.cached("missing.test") is None
+    time.sleep(0.25)
+    with pytest.raises(socket.gaierror):
+        r.resolve("missing.test")
+    assert len(lookup.calls) == 2
+
+def test_empty_answer_means_nonexistent():
+    r = Resolver(lookup=StubLookup(([], 300)))
+    with pytest.raises(socket.gaierror):
+        r.resolve("empty.test")
+
+def test_other_failures_are_not_cached():
+    lookup = StubLookup(OSError("network unreachable"))
+    r = Resolver(lookup=lookup)
+    for _ in range(2):
+        with pytest.raises(OSError):
+            r.resolve("example.test")
+    assert len(lookup.calls) == 2
+
+def test_literal_ip_needs_no_lookup():
+    lookup = StubLookup()
+    r = Resolver(lookup=lookup)
+    assert r.resolve("127.0.0.1") == ["127.0.0.1"]
+    assert r.resolve("[::1]") == ["::1"]
+    assert lookup.calls == []
+
+def test_concurrent_lookups_of_one_host_are_coalesced():
+    gate = threading.Event()
+    lookup = StubLookup(gate=gate)
+    r = Resolver(lookup=lookup)
+    start = threading.Barrier(8)
+    results = []
+
+    def resolve():
+        start.wait()
+        results.append(r.resolve("example.test", timeout=5))
+
+    threads = [threading.Thread(target=resolve) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert results == [["192.0.2.1"]] * 8
+    assert lookup.calls == ["example.test"]
+
+def test_slow_lookup_times_out_and_still_fills_the_cache():
+    lookup = StubLookup(delay=0.3)
+    r = Resolver(lookup=lookup)
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        r.resolve("slow.test", timeout=0.05)
+    assert time.perf_counter() - start < 0.2
+    # The lookup keeps running and its answer is cached for the next caller
+    assert r.resolve("slow.test", timeout=1) == ["192.0.2.1"]
+    assert len(lookup.calls) == 1
+    assert r.cached("slow.test") == ["192.0.2.1"]
+
+def test_default_timeout_comes_from_the_resolver():
+    r = Resolver(lookup=StubLookup(delay=0.3), timeout=0.05)
+    with pytest.raises(TimeoutError):
+        r.resolve("slow.test")
+
+def guard():
+    return ProbeGuard("dns", rate=1000, burst=1000, failure_threshold=2, reset_timeout=60)
+
+def test_guard_counts_only_failing_lookups():
+    g = guard()
+    r = Resolver(lookup=StubLookup(nx()), guard=g, negative_ttl=0)
+    for _ in range(3):
+        with pytest.raises(socket.gaierror):
+            r.resolve("missing.test")
+    assert g.state("missing.test") == "closed"
+
+    r = Resolver(lookup=StubLookup(OSError("refused")), guard=g)
+    for _ in range(2):
+        with pytest.raises(OSError):
+            r.resolve("broken.test")
+    with pytest.raises(ProbeRejected):
+        r.resolve("broken.test")
+
+def test_servfail_counts_against_the_name():
+    g = guard()
+    r = Resolver(lookup=StubLookup(socket.gaierror(socket.EAI_AGAIN, "servfail")), guard=g, negative_ttl=0)
+    for _ in range(2):
+        with pytest.raises(socket.gaierror):
+            r.resolve("servfail.test")
+    assert g.state("servfail.test") == "open"
+
+def test_dnspython_maps_servfail_to_gaierror(monkeypatch):
+    def resolve(host, rdtype, lifetime=None):
+        raise dns.resolver.NoNameservers()
+    monkeypatch.setattr(resolver_module.dns.resolver, "resolve", resolve)
+    with pytest.raises(socket.gaierror) as e:
+        dnspython_lookup("servfail.test", 1.0)
+    assert e.value.errno == socket.EAI_AGAIN
+
+def test_dnspython_maps_nxdomain_to_gaierror(monkeypatch):
+    def resolve(host, rdtype, lifetime=None):
+        raise dns.resolver.NXDOMAIN()
+    monkeypatch.setattr(resolver_module.dns.resolver, "resolve", resolve)
+    with pytest.raises(socket.gaierror) as e:
+        dnspython_lookup("missing.test", 1.0)
+    assert e.value.errno == socket.EAI_NONAME
+
+def session(resolver):
+    s = requests.Session()
+    s.mount("http://", ResolvedHTTPAdapter(resolver, max_retries=0))
+    return s
+
+def test_adapter_reports_a_missing_name_as_name_resolution_error():
+    with pytest.raises(requests.exceptions.ConnectionError) as e:
+        session(Resolver(lookup=StubLookup(nx()))).get("http://missing.test/", timeout=1)
+    assert isinstance(e.value.args[0].reason, NameResolutionError)
+
+def test_adapter_reports_a_slow_lookup_as_dns_timeout():
+    with pytest.raises(requests.exceptions.ConnectTimeout) as e:
+        session(Resolver(lookup=StubLookup(delay=0.5))).get("http://slow.test/", timeout=0.05)
+    assert isinstance(e.value.args[0].reason, DNSTimeoutError)
+
+class OK(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def http_port():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OK)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+def test_adapter_tries_the_next_address_when_one_refuses(http_port):
+    # Nothing listens on 127.0.0.2: the server is bound to 127.0.0.1 only
+    r = Resolver(lookup=StubLookup((["127.0.0.2", "127.0.0.1"], 300)))
+    assert session(r).get(f"http://multi.test:{http_port}/", timeout=2).status_code == 200
+
+def test_adapter_reports_the_last_error_when_every_address_refuses(http_port):
+    r = Resolver(lookup=StubLookup((["127.0.0.2", "127.0.0.3"], 300)))
+    with pytest.raises(requests.exceptions.ConnectionError) as e:
+        session(r).get(f"http://multi.test:{http_port}/", timeout=2)
+    assert isinstance(e.value.args[0].reason, NewConnectionError)
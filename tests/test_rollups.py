@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from rollups import RollupStore, bucket_start
+
+NOW = datetime(2026, 3, 10, 14, 25, 7)
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient()["test"]
+
+@pytest.fixture
+def store(db):
+    return RollupStore(db)
+
+def check(at, prediction="legitimate", url="https://example.com/", signals=()):
+    return {"url": url, "prediction": prediction, "signals": list(signals), "checkedAt": at}
+
+def test_bucket_start():
+    assert bucket_start(NOW, "hour") == datetime(2026, 3, 10, 14)
+    assert bucket_start(NOW, "day") == datetime(2026, 3, 10)
+
+def test_checks_on_either_side_of_an_hour_land_in_different_buckets(store, db):
+    store.record([
+        check(datetime(2026, 3, 10, 13, 59, 59, 999999)),
+        check(datetime(2026, 3, 10, 14, 0, 0)),
+        check(datetime(2026, 3, 10, 14, 59, 59), prediction="phishing"),
+    ])
+    hourly = {b["_id"]: b for b in db["urlchecks_hourly"].find()}
+    assert hourly[datetime(2026, 3, 10, 13)]["total"] == 1
+    assert hourly[datetime(2026, 3, 10, 14)]["total"] == 2
+    assert hourly[datetime(2026, 3, 10, 14)]["predictions"] == {"legitimate": 1, "phishing": 1}
+    daily = list(db["urlchecks_daily"].find())
+    assert [(b["_id"], b["total"]) for b in daily] == [(datetime(2026, 3, 10), 3)]
+
+def test_checks_on_either_side_of_midnight_land_in_different_days(store, db):
+    store.record([check(datetime(2026, 3, 9, 23, 59, 59)), check(datetime(2026, 3, 10, 0, 0))])
+    assert sorted(b["_id"] for b in db["urlchecks_daily"].find()) == [datetime(2026, 3, 9), datetime(2026, 3, 10)]
+
+def test_batches_accumulate_into_the_same_bucket(store, db):
+    store.record([check(NOW)])
+    store.record([check(NOW, prediction="phishing", signals=["SFH"])])
+    bucket = db["urlchecks_hourly"].find_one({"_id": datetime(2026, 3, 10, 14)})
+    assert bucket["total"] == 2
+    assert bucket["signals"] == {"SFH": 1}
+
+def test_checks_without_a_timestamp_are_skipped(store, db):
+    store.record([{"url": "https://example.com/", "prediction": "phishing"}])
+    assert db["urlchecks_hourly"].count_documents({}) == 0
+
+def test_domains_with_dots_are_stored_escaped_and_read_back(store, db):
+    store.record([
+        check(NOW, "phishing", "https://login.secure-bank.co.uk/verify"),
+        check(NOW, "phishing", "http://secure-bank.co.uk/"),
+        check(NOW, "phishing", "http://other.example.com/"),
+        check(NOW, "legitimate", "https://example.com/"),
+    ])
+    bucket = db["urlchecks_hourly"].find_one()
+    # Stored as one field, not a nested secure-bank -> co -> uk path
+    assert len(bucket["domains"]) == 2
+    assert all("." not in name for name in bucket["domains"])
+
+    top = store.timeseries("hour", 1, NOW)["top_flagged_domains"]
+    assert top == [{"domain": "secure-bank.co.uk", "count": 2}, {"domain": "example.com", "count": 1}]
+
+def test_timeseries_zero_fills_empty_buckets(store):
+    store.record([
+        check(NOW - timedelta(hours=3), "phishing", signals=["SFH"]),
+        check(NOW - timedelta(hours=3)),
+        check(NOW),
+    ])
+    result = store.timeseries("hour", 5, NOW)
+    buckets = result["buckets"]
+    assert [b["start"] for b in buckets] == [
+        (datetime(2026, 3, 10, 10) + timedelta(hours=i)).isoformat() for i in range(5)
+    ]
+    assert [b["total_checks"] for b in buckets] == [0, 2, 0, 0, 1]
+    assert buckets[1] == {"start": "2026-03-10T11:00:00", "total_checks": 2, "phishing_detected": 1,
+                          "legitimate": 1, "phishing_rate": 50.0}
+    assert buckets[0]["phishing_rate"] == 0
+    assert result["top_signals"] == [{"signal": "SFH", "count": 1}]
+
+def test_timeseries_ignores_buckets_before_the_window(store):
+    store.record([check(NOW - timedelta(days=3)), check(NOW)])
+    result = store.timeseries("day", 2, NOW)
+    assert [b["total_checks"] for b in result["buckets"]] == [0, 1]
@@ -0,0 +1,90 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+import score_urls
+from features import FEATURES
+from scoring import Scorer
+
+NAMES = [name for name, _, _, _ in FEATURES]
+FEED = ["# feed", "http://u1.test/", "http://u2.test/", "", "http://u3.test/", "http://u4.test/",
+        "http://u5.test/", "http://u6.test/", "http://u7.test/"]
+URLS = [line for line in FEED if line and not line.startswith("#")]
+
+class Interrupted(BaseException):
+    pass
+
+@pytest.fixture
+def scorer():
+    rng = np.random.default_rng(0)
+    X = rng.integers(-1, 2, size=(200, len(NAMES)))
+    model = DecisionTreeClassifier(max_depth=3).fit(X, np.where(X.sum(axis=1) > 0, 1, -1))
+    return Scorer(model, NAMES)
+
+@pytest.fixture
+def run(tmp_path, monkeypatch, scorer):
+    """run(fmt, interrupt_after=None) scores FEED, returning the URLs extracted"""
+    feed = tmp_path / "feed.txt"
+    feed.write_text("\n".join(FEED) + "\n")
+    monkeypatch.setattr(score_urls, "build_scorer", lambda args: scorer)
+    write_checkpoint = score_urls.write_checkpoint
+
+    def run(fmt, interrupt_after=None):
+        seen = []
+
+        def extract(url, timeout=None):
+            seen.append(url)
+            return [1] * len(NAMES), []
+
+        def checkpoint(path, lines, output_bytes):
+            write_checkpoint(path, lines, output_bytes)
+            if interrupt_after is not None and lines >= interrupt_after:
+                raise Interrupted()
+
+        monkeypatch.setattr(score_urls, "extract_features_detailed", extract)
+        monkeypatch.setattr(score_urls, "write_checkpoint", checkpoint)
+        args = [str(feed), "-o", str(tmp_path / f"out.{fmt}"), "--checkpoint", str(tmp_path / "ckpt"),
+                "--chunk", "3", "--workers", "2"]
+        try:
+            score_urls.main(args)
+        except Interrupted:
+            pass
+        return seen
+    return run
+
+def read_output(path, fmt):
+    if fmt == "csv":
+        with open(path, newline="") as f:
+            return list(csv.reader(f))
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_resume_after_interrupt_writes_every_url_once(run, tmp_path, fmt):
+    first = run(fmt, interrupt_after=3)
+    assert first == URLS[:2]
+    ckpt = json.loads((tmp_path / "ckpt").read_text())
+    assert ckpt["lines"] == 3
+
+    # Rows written after the checkpoint, as a crash mid-chunk would leave them
+    out = tmp_path / f"out.{fmt}"
+    with open(out, "a") as f:
+        f.write("partial row\n")
+
+    second = run(fmt)
+    assert second == URLS[2:]
+    rows = read_output(out, fmt)
+    if fmt == "csv":
+        assert rows[0][0] == "url"
+        assert [r[0] for r in rows[1:]] == URLS
+    else:
+        assert [r["url"] for r in rows] == URLS
+    assert json.loads((tmp_path / "ckpt").read_text())["lines"] == len(FEED)
+
+def test_checkpoint_offset_matches_the_output(run, tmp_path):
+    run("csv", interrupt_after=3)
+    ckpt = json.loads((tmp_path / "ckpt").read_text())
+    assert ckpt["output_bytes"] == (tmp_path / "out.csv").stat().st_size
@@ -0,0 +1,25 @@
+import numpy as np
+
+from scoring import LookupTableScorer
+
+def table(n=2):
+    rng = np.random.default_rng(0)
+    probas = rng.random((3 ** n, 2))
+    return LookupTableScorer(probas / probas.sum(axis=1, keepdims=True), [-1, 1], [f"f{i}" for i in range(n)])
+
+def test_saved_table_is_found_at_the_given_path(tmp_path):
+    path = tmp_path / "scorer.lut"
+    table().save(str(path), model_version="abc", accuracy=None)
+    assert path.exists()
+    assert not (tmp_path / "scorer.lut.npz").exists()
+
+def test_saved_table_loads_back(tmp_path):
+    original = table()
+    path = str(tmp_path / "scorer.npz")
+    original.save(path, model_version="abc", accuracy=0.9)
+    loaded, meta = LookupTableScorer.load(path)
+    assert meta == {"model_version": "abc", "accuracy": 0.9}
+    assert loaded.feature_names == original.feature_names
+    assert loaded.classes == original.classes
+    assert np.array_equal(loaded.probas, original.probas)
+    assert loaded.score_one([1, -1])[0] == original.score_one([1, -1])[0]
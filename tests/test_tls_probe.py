@@ -0,0 +1,254 @@
+import ssl
+import socket
+import asyncio
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from tls_probe import CertInfo, TLSProbe
+
+DATA = Path(__file__).parent / "data"
+CERT = str(DATA / "localhost.crt")
+KEY = str(DATA / "localhost.key")
+
+class StubResolver:
+    """Resolves every name to `addresses`, or fails with `error`"""
+
+    def __init__(self, error=None, addresses=("127.0.0.1",)):
+        self.error = error
+        self.addresses = list(addresses)
+
+    def resolve(self, host, timeout=None):
+        if self.error is not None:
+            raise self.error
+        return self.addresses
+
+    def resolve_async(self, host):
+        future = Future()
+        if self.error is not None:
+            future.set_exception(self.error)
+        else:
+            future.set_result(self.addresses)
+        return future
+
+class RecordingGuard:
+    def __init__(self):
+        self.calls = []
+
+    def acquire(self, target):
+        self.calls.append(("acquire", target))
+
+    def success(self, target):
+        self.calls.append(("success", target))
+
+    def failure(self, target):
+        self.calls.append(("failure", target))
+
+@pytest.fixture
+def tls_port():
+    """Port of a local TLS server presenting the self-signed localhost certificate"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(CERT, KEY)
+    server = socket.create_server(("127.0.0.1", 0))
+    server.settimeout(0.2)
+    stop = threading.Event()
+
+    def serve():
+        while not stop.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            try:
+                with context.wrap_socket(conn, server_side=True):
+                    pass
+            except (ssl.SSLError, OSError):
+                conn.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield server.getsockname()[1]
+    stop.set()
+    thread.join()
+    server.close()
+
+@pytest.fixture
+def plain_port():
+    """Port of a local server that answers in plain HTTP instead of TLS"""
+    server = socket.create_server(("127.0.0.1", 0))
+    server.settimeout(0.2)
+    stop = threading.Event()
+
+    def serve():
+        while not stop.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            with conn:
+                conn.sendall(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield server.getsockname()[1]
+    stop.set()
+    thread.join()
+    server.close()
+
+@pytest.fixture
+def closed_port():
+    with socket.create_server(("127.0.0.1", 0)) as s:
+        return s.getsockname()[1]
+
+def trusting_context():
+    return ssl.create_default_context(cafile=CERT)
+
+def test_valid_certificate(tls_port):
+    probe = TLSProbe(StubResolver(), context=trusting_context())
+    info = probe.check("localhost", tls_port)
+    assert info.status == "valid"
+    assert info.issuer == "Test CA"
+    assert info.not_after.year == 2126
+    assert info.not_before < datetime.now(timezone.utc) < info.not_after
+
+def test_untrusted_certificate_is_invalid(tls_port):
+    probe = TLSProbe(StubResolver())
+    info = probe.check("localhost", tls_port)
+    assert info.status == "invalid"
+    assert "self" in info.reason
+
+def test_hostname_mismatch_is_invalid(tls_port):
+    probe = TLSProbe(StubResolver(), context=trusting_context())
+    assert probe.check("other.test", tls_port).status == "invalid"
+
+def test_refused_connection_is_error(closed_port):
+    probe = TLSProbe(StubResolver(), timeout=1.0)
+    info = probe.check("localhost", closed_port)
+    assert info.status == "error"
+    assert not info.valid
+
+def test_second_check_is_served_from_cache(tls_port):
+    handshakes = []
+    probe = TLSProbe(StubResolver(), context=trusting_context(),
+                     on_handshake=lambda seconds, info: handshakes.append(info))
+    first = probe.check("LocalHost.", tls_port)
+    assert probe.check("localhost", tls_port) is first
+    assert probe.cached("localhost", tls_port) is first
+    assert len(handshakes) == 1
+    assert probe.stats()["hits"] == 2
+
+def test_concurrent_checks_share_one_handshake(tls_port):
+    handshakes = []
+    probe = TLSProbe(StubResolver(), context=trusting_context(),
+                     on_handshake=lambda seconds, info: handshakes.append(info))
+    start = threading.Barrier(8)
+    results = []
+
+    def check():
+        start.wait()
+        results.append(probe.check("localhost", tls_port))
+
+    threads = [threading.Thread(target=check) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [r.status for r in results] == ["valid"] * 8
+    assert len(handshakes) <= 2
+
+def test_check_async(tls_port):
+    handshakes = []
+    probe = TLSProbe(StubResolver(), context=trusting_context(),
+                     on_handshake=lambda seconds, info: handshakes.append(info))
+
+    async def main():
+        return await asyncio.gather(*(probe.check_async("localhost", tls_port) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert {r.status for r in results} == {"valid"}
+    assert len(handshakes) == 1
+    assert probe.cached("localhost", tls_port) is results[0]
+
+@pytest.fixture
+def ttls(monkeypatch):
+    """TTL passed to the verdict cache for each probe of a TLSProbe"""
+    def spy(probe):
+        recorded = []
+        original = probe._cache.set
+
+        def set(key, value, ttl=None):
+            recorded.append(ttl)
+            original(key, value, ttl=ttl)
+
+        monkeypatch.setattr(probe._cache, "set", set)
+        return recorded
+    return spy
+
+def stubbed(probe, monkeypatch, info):
+    monkeypatch.setattr(probe, "_handshake", lambda host, address, port, deadline: info)
+    return probe
+
+def test_valid_verdict_expires_with_the_certificate(monkeypatch, ttls):
+    not_after = datetime.now(timezone.utc) + timedelta(seconds=120)
+    probe = stubbed(TLSProbe(StubResolver(), max_ttl=3600), monkeypatch, CertInfo("valid", not_after=not_after))
+    recorded = ttls(probe)
+    probe.check("example.test")
+    assert 110 < recorded[0] <= 120
+
+def test_valid_verdict_is_capped_at_max_ttl(monkeypatch, ttls):
+    not_after = datetime.now(timezone.utc) + timedelta(days=365)
+    probe = stubbed(TLSProbe(StubResolver(), max_ttl=3600), monkeypatch, CertInfo("valid", not_after=not_after))
+    recorded = ttls(probe)
+    probe.check("example.test")
+    assert recorded == [3600]
+
+def test_expired_certificate_is_not_cached(monkeypatch, ttls):
+    not_after = datetime.now(timezone.utc) - timedelta(seconds=1)
+    probe = stubbed(TLSProbe(StubResolver()), monkeypatch, CertInfo("valid", not_after=not_after))
+    recorded = ttls(probe)
+    assert probe.check("example.test").status == "valid"
+    assert recorded == []
+    assert probe.cached("example.test") is None
+
+@pytest.mark.parametrize("status, ttl", [("invalid", 600), ("error", 60)])
+def test_failed_verdicts_use_their_own_ttl(monkeypatch, ttls, status, ttl):
+    probe = stubbed(TLSProbe(StubResolver(), invalid_ttl=600, error_ttl=60), monkeypatch, CertInfo(status))
+    recorded = ttls(probe)
+    probe.check("example.test")
+    assert recorded == [ttl]
+
+def test_guard_hears_handshake_outcomes(tls_port, closed_port):
+    guard = RecordingGuard()
+    TLSProbe(StubResolver(), guard=guard).check("localhost", tls_port)
+    TLSProbe(StubResolver(), timeout=1.0, guard=guard).check("localhost", closed_port)
+    # An untrusted certificate still means the host answered
+    assert guard.calls == [("acquire", "localhost"), ("success", "localhost"),
+                           ("acquire", "localhost"), ("failure", "localhost")]
+
+def test_unresolved_name_is_not_reported_to_the_guard():
+    guard = RecordingGuard()
+    resolver = StubResolver(socket.gaierror(socket.EAI_NONAME, "Name or service not known"))
+    info = TLSProbe(resolver, guard=guard).check("missing.test")
+    assert info.status == "error"
+    assert guard.calls == []
+
+def test_plain_http_on_the_port_is_invalid(plain_port):
+    guard = RecordingGuard()
+    info = TLSProbe(StubResolver(), timeout=1.0, guard=guard).check("localhost", plain_port)
+    assert info.status == "invalid"
+    # The host answered, just not with TLS
+    assert guard.calls == [("acquire", "localhost"), ("success", "localhost")]
+
+def test_plain_http_on_the_port_is_invalid_async(plain_port):
+    info = asyncio.run(TLSProbe(StubResolver(), timeout=1.0).check_async("localhost", plain_port))
+    assert info.status == "invalid"
+
+def test_next_address_is_tried_when_the_first_refuses(tls_port):
+    # Nothing listens on 127.0.0.2: the server is bound to 127.0.0.1 only
+    resolver = StubResolver(addresses=["127.0.0.2", "127.0.0.1"])
+    assert TLSProbe(resolver, context=trusting_context()).check("localhost", tls_port).status == "valid"
+    info = asyncio.run(TLSProbe(resolver, context=trusting_context()).check_async("localhost", tls_port))
+    assert info.status == "valid"
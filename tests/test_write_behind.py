@@ -0,0 +1,151 @@
+import time
+import threading
+
+import mongomock
+import pytest
+
+from write_behind import WriteBehindQueue
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient()["test"]["urlchecks"]
+
+class GatedCollection:
+    """Collection whose insert_many waits until `gate` is set"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+
+    def insert_many(self, docs, ordered=True):
+        self.entered.set()
+        self.gate.wait(5)
+        return self.collection.insert_many(docs, ordered=ordered)
+
+class FailingCollection:
+    def insert_many(self, docs, ordered=True):
+        raise RuntimeError("primary stepped down")
+
+def docs(n, start=0):
+    return [{"n": i} for i in range(start, start + n)]
+
+def test_flushes_when_a_batch_fills(collection):
+    writer = WriteBehindQueue(collection, batch_size=5, flush_interval=60)
+    writer.put_many(docs(5))
+    assert wait_for(lambda: collection.count_documents({}) == 5)
+    assert writer.stats()["flushes"] == 1
+    writer.close()
+
+def test_flushes_a_partial_batch_after_the_interval(collection):
+    writer = WriteBehindQueue(collection, batch_size=100, flush_interval=0.3)
+    writer.put_many(docs(3))
+    assert collection.count_documents({}) == 0
+    assert wait_for(lambda: collection.count_documents({}) == 3)
+    writer.close()
+
+def test_on_flush_gets_each_written_batch(collection):
+    batches = []
+    writer = WriteBehindQueue(collection, batch_size=2, flush_interval=60, on_flush=batches.append)
+    writer.put_many(docs(4))
+    assert wait_for(lambda: len(batches) == 2)
+    assert [d["n"] for batch in batches for d in batch] == [0, 1, 2, 3]
+    writer.close()
+
+def test_failed_insert_is_counted(collection):
+    batches = []
+    writer = WriteBehindQueue(FailingCollection(), batch_size=2, flush_interval=60, on_flush=batches.append)
+    writer.put_many(docs(2))
+    assert wait_for(lambda: writer.stats()["failed"] == 2)
+    assert batches == []
+    writer.close()
+
+def full_writer(collection, **kwargs):
+    """Writer whose worker is stuck writing one document, with a full queue of two"""
+    gated = GatedCollection(collection)
+    writer = WriteBehindQueue(gated, max_size=2, batch_size=1, flush_interval=60, **kwargs)
+    assert writer.put({"n": 0})
+    assert gated.entered.wait(3)
+    assert writer.put({"n": 1}) and writer.put({"n": 2})
+    return writer, gated
+
+def test_drop_policy_drops_when_full(collection):
+    writer, gated = full_writer(collection, policy="drop")
+    start = time.perf_counter()
+    assert writer.put({"n": 3}) is False
+    assert time.perf_counter() - start < 0.1
+    stats = writer.stats()
+    assert (stats["enqueued"], stats["dropped"]) == (3, 1)
+    gated.gate.set()
+    writer.close()
+    assert sorted(d["n"] for d in collection.find()) == [0, 1, 2]
+
+def test_block_policy_waits_then_drops(collection):
+    writer, gated = full_writer(collection, policy="block", block_timeout=0.2)
+    start = time.perf_counter()
+    assert writer.put({"n": 3}) is False
+    assert time.perf_counter() - start >= 0.2
+    assert writer.stats()["dropped"] == 1
+    gated.gate.set()
+    writer.close()
+
+def test_block_policy_waits_for_room(collection):
+    writer, gated = full_writer(collection, policy="block", block_timeout=3)
+    threading.Timer(0.1, gated.gate.set).start()
+    assert writer.put({"n": 3}) is True
+    writer.close()
+    assert collection.count_documents({}) == 4
+
+def test_non_blocking_put_ignores_the_block_policy(collection):
+    writer, gated = full_writer(collection, policy="block", block_timeout=3)
+    start = time.perf_counter()
+    assert writer.put_many(docs(2, start=3), block=False) == 0
+    assert time.perf_counter() - start < 0.1
+    gated.gate.set()
+    writer.close()
+
+def test_close_writes_everything_queued(collection):
+    writer = WriteBehindQueue(collection, batch_size=100, flush_interval=60)
+    writer.put_many(docs(250))
+    writer.close()
+    assert collection.count_documents({}) == 250
+    stats = writer.stats()
+    assert (stats["enqueued"], stats["written"], stats["queue_depth"]) == (250, 250, 0)
+
+def test_put_after_close_is_dropped(collection):
+    writer = WriteBehindQueue(collection)
+    writer.close()
+    assert writer.put({"n": 0}) is False
+    assert writer.stats()["dropped"] == 1
+    assert collection.count_documents({}) == 0
+
+def test_counters_are_exact_under_concurrent_puts(collection):
+    writer = WriteBehindQueue(collection, max_size=100, batch_size=50, flush_interval=0.05)
+    start = threading.Barrier(8)
+
+    def put():
+        start.wait()
+        for i in range(500):
+            writer.put({"n": i})
+
+    threads = [threading.Thread(target=put) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    writer.close()
+    stats = writer.stats()
+    assert stats["enqueued"] + stats["dropped"] == 4000
+    assert stats["written"] == stats["enqueued"] == collection.count_documents({})
+
+def test_unknown_policy_is_rejected(collection):
+    with pytest.raises(ValueError):
+        WriteBehindQueue(collection, policy="spill")
@@ -0,0 +1,213 @@
+import ssl
+import time
+import asyncio
+import socket
+import logging
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+import certifi
+
+from cache import TTLCache, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+class CertInfo(NamedTuple):
+    """Outcome of one TLS handshake with certificate verification.
+
+    status is "valid", "invalid" (the host accepted the connection but the
+    chain or hostname did not verify, or the TLS handshake itself failed,
+    e.g. plain HTTP on the port) or "error" (no connection: refused, timed
+    out). issuer and the validity period are only known for valid
+    certificates.
+    """
+    status: str
+    reason: str = ""
+    issuer: Optional[str] = None
+    not_before: Optional[datetime] = None
+    not_after: Optional[datetime] = None
+
+    @property
+    def valid(self):
+        return self.status == "valid"
+
+def _cert_time(value):
+    return datetime.fromtimestamp(ssl.cert_time_to_seconds(value), timezone.utc)
+
+def _tls_failed(e):
+    """Verdict for an ssl.SSLError raised after the TCP connection was made"""
+    if isinstance(e, ssl.SSLCertVerificationError):
+        return CertInfo("invalid", e.verify_message or str(e))
+    return CertInfo("invalid", e.reason or str(e))
+
+def _connect_failed(e):
+    return CertInfo("error", str(e) or type(e).__name__)
+
+def _issuer_name(cert):
+    fields = dict(pair for rdn in cert.get("issuer", ()) for pair in rdn)
+    return fields.get("organizationName") or fields.get("commonName")
+
+class TLSProbe:
+    """Certificate checks by TLS handshake alone, cached per host:port.
+
+    No HTTP request is sent. A valid verdict is cached until the
+    certificate's notAfter (at most max_ttl seconds); invalid certificates
+    are cached for invalid_ttl and connection failures for error_ttl.
+    Each resolved address is tried in turn, within the one timeout, until
+    one accepts the connection. Concurrent checks of one host:port share a
+    single handshake;
+    check_async() does the same on an asyncio event loop. `on_handshake`,
+    if given, is called with (seconds, CertInfo) after every handshake.
+    With a ProbeGuard, a handshake first calls guard.acquire(host) (a
+    rejection raises ProbeRejected to every caller) and a connection error
+    is reported to it as a failure; a name that doesn't resolve is not.
+    """
+
+    def __init__(self, resolver, timeout=3.0, maxsize=10000, max_ttl=3600,
+                 invalid_ttl=600, error_ttl=60, context=None, on_handshake=None, guard=None):
+        self.resolver = resolver
+        self.timeout = timeout
+        self.max_ttl = max_ttl
+        self.invalid_ttl = invalid_ttl
+        self.error_ttl = error_ttl
+        # The CA bundle requests verifies against, not whatever the OS ships
+        self.context = context or ssl.create_default_context(cafile=certifi.where())
+        self.on_handshake = on_handshake
+        self.guard = guard
+        self._cache = TTLCache(maxsize=maxsize, ttl=max_ttl)
+        self._flight = SingleFlight()
+        self._tasks = {}
+
+    def check(self, host, port=443):
+        key = (host.lower().rstrip("."), port)
+        info = self._cache.get(key)
+        if info is not None:
+            return info
+        return self._flight.do(key, self._probe, *key)
+
+    async def check_async(self, host, port=443):
+        """check() without blocking the event loop"""
+        key = (host.lower().rstrip("."), port)
+        info = self._cache.get(key)
+        if info is not None:
+            return info
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(self._probe_async(*key))
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        # A caller giving up must not cancel the handshake others are waiting on
+        return await asyncio.shield(task)
+
+    def cached(self, host, port=443):
+        """Cached verdict for host:port, or None without probing"""
+        return self._cache.get((host.lower().rstrip("."), port))
+
+    def stats(self):
+        return self._cache.stats()
+
+    def _probe(self, host, port):
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        try:
+            addresses = self.resolver.resolve(host, timeout=self.timeout)
+        except (OSError, TimeoutError) as e:
+            return self._unresolved(host, port, e, time.perf_counter() - start)
+        if self.guard is not None:
+            self.guard.acquire(host)
+        for address in addresses:
+            info = self._handshake(host, address, port, deadline)
+            if info.status != "error" or time.monotonic() >= deadline:
+                break
+        return self._remember(host, port, info, time.perf_counter() - start)
+
+    async def _probe_async(self, host, port):
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        try:
+            lookup = asyncio.wrap_future(self.resolver.resolve_async(host))
+            addresses = await asyncio.wait_for(asyncio.shield(lookup), self.timeout)
+        except (OSError, TimeoutError) as e:
+            return self._unresolved(host, port, e, time.perf_counter() - start)
+        if self.guard is not None:
+            self.guard.acquire(host)
+        for address in addresses:
+            info = await self._handshake_async(host, address, port, deadline)
+            if info.status != "error" or time.monotonic() >= deadline:
+                break
+        return self._remember(host, port, info, time.perf_counter() - start)
+
+    def _unresolved(self, host, port, error, elapsed):
+        # The name didn't resolve: the host was never contacted, so the
+        # guard hears nothing (the resolver reports to its own)
+        return self._remember(host, port, CertInfo("error", str(error) or type(error).__name__),
+                              elapsed, reached=False)
+
+    def _remember(self, host, port, info, elapsed, reached=True):
+        if self.on_handshake is not None:
+            self.on_handshake(elapsed, info)
+        if self.guard is not None and reached:
+            # An invalid certificate still means the host answered
+            (self.guard.failure if info.status == "error" else self.guard.success)(host)
+        if info.status == "valid":
+            ttl = self.max_ttl
+            if info.not_after is not None:
+                ttl = min(ttl, (info.not_after - datetime.now(timezone.utc)).total_seconds())
+        else:
+            ttl = self.invalid_ttl if info.status == "invalid" else self.error_ttl
+        if ttl > 0:
+            self._cache.set((host, port), info, ttl=ttl)
+        return info
+
+    def _handshake(self, host, address, port, deadline):
+        try:
+            sock = socket.create_connection((address, port), timeout=max(0.01, deadline - time.monotonic()))
+        except (OSError, TimeoutError) as e:
+            return _connect_failed(e)
+        with sock:
+            try:
+                sock.settimeout(max(0.01, deadline - time.monotonic()))
+                with self.context.wrap_socket(sock, server_hostname=host) as tls:
+                    cert = tls.getpeercert()
+            except ssl.SSLError as e:
+                return _tls_failed(e)
+            except (OSError, TimeoutError) as e:
+                return _connect_failed(e)
+
+        return self._verified(host, port, cert)
+
+    async def _handshake_async(self, host, address, port, deadline):
+        loop = asyncio.get_running_loop()
+        family = socket.AF_INET6 if ":" in address else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, (address, port)), max(0.01, deadline - time.monotonic()))
+        except (OSError, TimeoutError) as e:
+            sock.close()
+            return _connect_failed(e)
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(sock=sock, ssl=self.context, server_hostname=host),
+                max(0.01, deadline - time.monotonic()))
+        except ssl.SSLError as e:
+            sock.close()
+            return _tls_failed(e)
+        except (OSError, TimeoutError) as e:
+            sock.close()
+            return _connect_failed(e)
+        cert = writer.get_extra_info("peercert")
+        writer.close()
+
+        return self._verified(host, port, cert)
+
+    def _verified(self, host, port, cert):
+        try:
+            return CertInfo(
+                "valid",
+                issuer=_issuer_name(cert),
+                not_before=_cert_time(cert["notBefore"]),
+                not_after=_cert_time(cert["notAfter"]),
+            )
+        except (KeyError, ValueError, TypeError) as e:
+            logger.warning(f"TLS probe: unreadable certificate for {host}:{port}: {e}")
+            return CertInfo("valid")
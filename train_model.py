@@ -1,6 +1,8 @@
 import os
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestClassifier
 from joblib import dump
 
@@ -41,13 +43,95 @@ model = RandomForestClassifier(
 model.fit(X_train, y_train)
 accuracy = model.score(X_test, y_test)
 
+# Lexical-only model for the fast-path tier: these columns come from the URL
+# string alone, so it can score before any network probe runs.
+lexical_features = [
+    "having_IP_Address",
+    "URL_Length",
+    "Shortining_Service",
+    "having_At_Symbol",
+    "double_slash_redirecting",
+    "Prefix_Suffix",
+    "having_Sub_Domain",
+    "port",
+    "HTTPS_token",
+]
+
+# Largest accuracy drop vs. the full model that the tiered mode may cost
+tier_tolerance = float(os.getenv("TIER_TOLERANCE", "0.01"))
+
+X_lex = data[lexical_features].apply(pd.to_numeric, errors="coerce").fillna(0)
+X_lex_train, X_lex_test = X_lex.loc[X_train.index], X_lex.loc[X_test.index]
+
+lexical_model = RandomForestClassifier(
+    n_estimators=200,
+    max_depth=12,
+    min_samples_leaf=4,
+    random_state=42,
+    n_jobs=-1,
+    class_weight="balanced"
+)
+lexical_model.fit(X_lex_train, y_train)
+lexical_accuracy = lexical_model.score(X_lex_test, y_test)
+
+def tiered_predictions(lex_proba, full_pred, low, high):
+    """Lexical verdict outside (low, high), full-model verdict inside; and which rows escalated"""
+    escalate = (lex_proba > low) & (lex_proba < high)
+    return np.where(escalate, full_pred, np.where(lex_proba >= high, 1, -1)), escalate
+
+def phishing_proba(clf, X):
+    return clf.predict_proba(X)[:, list(clf.classes_).index(1)]
+
+# Pick the uncertainty band that sends the fewest URLs on to the network
+# features while keeping tiered accuracy within tolerance of the full model.
+# The band is chosen on a validation split held out of the training rows
+# (with both models refit on the rest), so the test split stays unseen
+# until the tiered accuracy is reported on it.
+X_fit, X_val, y_fit, y_val = train_test_split(
+    X_train, y_train, test_size=0.25, random_state=42, stratify=y_train
+)
+val_model = clone(model).fit(X_fit, y_fit)
+val_lexical_model = clone(lexical_model).fit(X_lex.loc[X_fit.index], y_fit)
+val_accuracy = val_model.score(X_val, y_val)
+val_lex_proba = phishing_proba(val_lexical_model, X_lex.loc[X_val.index])
+val_full_pred = val_model.predict(X_val)
+
+# The band always straddles 0.5, as app.py requires: a probability of
+# exactly 0.5 is never a lexical verdict
+best = None
+for low in np.arange(0.0, 0.5, 0.01):
+    for high in np.arange(0.51, 1.0001, 0.01):
+        pred, escalate = tiered_predictions(val_lex_proba, val_full_pred, low, high)
+        tiered_accuracy = float((pred == y_val.values).mean())
+        rate = float(escalate.mean())
+        if tiered_accuracy >= val_accuracy - tier_tolerance and (best is None or rate < best["validation_escalation_rate"]):
+            best = {
+                "band": [round(float(low), 2), round(float(high), 2)],
+                "validation_accuracy": tiered_accuracy,
+                "validation_escalation_rate": rate,
+                "tolerance": tier_tolerance,
+            }
+
+# Tiered accuracy of the shipped models on the test split
+pred, escalate = tiered_predictions(phishing_proba(lexical_model, X_lex_test), model.predict(X_test), *best["band"])
+best["accuracy"] = float((pred == y_test.values).mean())
+best["escalation_rate"] = float(escalate.mean())
+
 model_artifact = {
     "model": model,
     "features": discriminative_features,
     "model_type": "RandomForest",
     "accuracy": accuracy,
+    "lexical_model": lexical_model,
+    "lexical_features": lexical_features,
+    "lexical_accuracy": lexical_accuracy,
+    "tier": best,
 }
 
 dump(model_artifact, "models/phishing_model_optimized.pkl")
 
-print(f"Model trained: {accuracy:.4f} accuracy")
\ No newline at end of file
+print(f"Model trained: {accuracy:.4f} accuracy")
+print(f"Lexical model trained: {lexical_accuracy:.4f} accuracy")
+print(f"Tiered band {best['band']} (chosen on validation, tolerance {tier_tolerance:.2%}): "
+      f"{best['accuracy']:.4f} test accuracy, "
+      f"{best['escalation_rate']:.1%} of URLs need network features")
\ No newline at end of file
@@ -0,0 +1,158 @@
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindQueue:
+    """Buffers documents in memory and inserts them in batches off the request path.
+
+    A background thread flushes with insert_many whenever `batch_size`
+    documents are waiting or `flush_interval` seconds have passed. At most
+    `max_size` documents are buffered; when full, put() either drops the
+    document (policy "drop") or blocks the caller for up to `block_timeout`
+    seconds before dropping it (policy "block"); put(doc, block=False)
+    never waits, whatever the policy. close() flushes what is
+    left. `on_flush`, if given, is called with each batch after it has been
+    written, and `on_flush_time` with the seconds each insert_many took,
+    both from the worker thread. The worker starts lazily on the first
+    put(), so an instance created before a fork starts its thread in the
+    child that uses it.
+    """
+
+    def __init__(self, collection, max_size=10000, batch_size=100,
+                 flush_interval=1.0, policy="drop", block_timeout=0.5, on_flush=None,
+                 on_flush_time=None):
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown write-behind policy: {policy}")
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.on_flush = on_flush
+        self.on_flush_time = on_flush_time
+        self._queue = queue.Queue(maxsize=max_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = threading.Event()
+        # put() runs on every request thread; += on a shared int isn't atomic
+        self._counts_lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def put(self, doc, block=True):
+        """Queue one document; returns False if it had to be dropped"""
+        if self._closed.is_set():
+            with self._counts_lock:
+                self.dropped += 1
+            return False
+        self._ensure_started()
+        try:
+            if self.policy == "block" and block:
+                self._queue.put(doc, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(doc)
+        except queue.Full:
+            with self._counts_lock:
+                self.dropped += 1
+            return False
+        with self._counts_lock:
+            self.enqueued += 1
+        return True
+
+    def put_many(self, docs, block=True):
+        return sum(1 for doc in docs if self.put(doc, block))
+
+    def close(self, timeout=10.0):
+        """Stop the worker after flushing everything still queued"""
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        else:
+            self._drain()
+
+    def stats(self):
+        with self._counts_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "written": self.written,
+                "failed": self.failed,
+                "flushes": self.flushes,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "max_flush_ms": round(self.max_flush_ms, 3),
+            }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._closed.is_set():
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+        self._drain()
+
+    def _collect(self):
+        """Wait for a full batch or the flush interval, whichever comes first"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._closed.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.1)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _drain(self):
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._flush(batch)
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        try:
+            self.collection.insert_many(batch, ordered=False)
+            with self._counts_lock:
+                self.written += len(batch)
+        except Exception as e:
+            with self._counts_lock:
+                self.failed += len(batch)
+            logger.warning(f"Write-behind: insert_many of {len(batch)} documents failed: {e}")
+        else:
+            if self.on_flush_time is not None:
+                self.on_flush_time(time.perf_counter() - start)
+            if self.on_flush is not None:
+                try:
+                    self.on_flush(batch)
+                except Exception as e:
+                    logger.warning(f"Write-behind: on_flush callback failed: {e}")
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._counts_lock:
+            self.flushes += 1
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)